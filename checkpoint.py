@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+checkpoint.py
+
+Checkpoint files for long streaming runs of main.py.
+
+A checkpoint is a small JSON file next to the output (<output>.ckpt):
+{
+  'input_file': str,        # absolute path of the Simon file
+  'input_size': int,        # size at the start of the run, to detect edits
+  'threshold': float,
+  'input_offset': int,      # byte offset just past the last analyzed line
+  'rows_written': int,
+  'output_bytes': int,      # size of the output file when the checkpoint was taken
+  'totals': { ... }         # path_analyzer.empty_totals() aggregates so far
+}
+
+The output file is flushed and fsynced before the checkpoint is (atomically)
+replaced, so the checkpoint never claims rows that aren't on disk. Rows
+written after the last checkpoint are cut off again on resume by truncating
+the output back to 'output_bytes'.
+"""
+
+import json
+import os
+
+def checkpoint_path_for(output_path):
+    return output_path + ".ckpt"
+
+def save_checkpoint(ckpt_path, state):
+    tmp_path = ckpt_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, ckpt_path)
+
+def load_checkpoint(ckpt_path):
+    """
+    Returns the checkpoint state dict, or None if there is no checkpoint.
+    """
+    if not os.path.exists(ckpt_path):
+        return None
+    with open(ckpt_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def remove_checkpoint(ckpt_path):
+    if os.path.exists(ckpt_path):
+        os.remove(ckpt_path)
+
+def check_resumable(state, input_file, threshold):
+    """
+    Returns None if 'state' can be resumed for this input/threshold,
+    otherwise a message saying why not.
+    """
+    if state['input_file'] != os.path.abspath(input_file):
+        return f"checkpoint is for {state['input_file']}, not {os.path.abspath(input_file)}"
+    if state['input_size'] != os.path.getsize(input_file):
+        return "input file changed size since the checkpoint was written"
+    if state['threshold'] != threshold:
+        return f"checkpoint used threshold {state['threshold']}, current threshold is {threshold}"
+    return None
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+cluster_shards.py
+
+Spreads one analysis over several machines with no shared service: a plan
+with N deterministic work units, one independent run per unit, and an exact
+merge.
+
+  python main.py plan-shards <input_file> <N> [--topology] [--output NAME] [--manifest PATH]
+  python main.py run-shard <manifest> <i> [--parts-dir DIR]
+  python main.py merge <manifest> [--parts-dir DIR]
+
+plan-shards
+  Simon file: N byte ranges [start, end), each starting at a line start
+  (the boundary is the first line start at or after size*k/N). The manifest
+  records each range with the sha256 of its bytes.
+  --topology: N contiguous ranges of the sorted access-node (source) list;
+  the manifest records the edge list's sha256.
+  Also recorded: the threshold and ANALYZER_VERSION, so every machine
+  analyzes the same way.
+
+run-shard i
+  Checks the unit's input hash, analyzes it and writes
+    <stem>.part-0000i-of-0000N.csv          (rows, no header)
+    <stem>.part-0000i-of-0000N.json         (rows, bytes, sha256, totals)
+  into --parts-dir (default: the manifest's directory).
+
+merge
+  Verifies every part against its .json, writes the header plus the parts in
+  unit order, which is the single-host CSV byte for byte, and replays the
+  network totals over the merged rows in order. Because floats are added in
+  the same order as a single-host run, the totals match exactly, too.
+  Writes them to <stem>.totals.json.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+
+import input_parser
+import output_formatter
+import path_analyzer
+import topology_paths
+
+COMMANDS = ('plan-shards', 'run-shard', 'merge')
+
+def _sha256_file(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def line_aligned_ranges(filepath, num_units):
+    """
+    Splits the file into num_units byte ranges that start at line starts.
+    Ranges may be empty for tiny files.
+    """
+    size = os.path.getsize(filepath)
+    bounds = [0]
+    with open(filepath, 'rb') as f:
+        for k in range(1, num_units):
+            target = max(size * k // num_units, bounds[-1])
+            if target == 0:
+                bounds.append(0)
+                continue
+            # the line containing byte target-1 ends at the boundary
+            f.seek(target - 1)
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(bounds[i], bounds[i+1]) for i in range(num_units)]
+
+def _range_sha256(filepath, start, end):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+def plan_shards(input_file, num_units, topology=False, output_name='path_analysis_output.csv'):
+    if num_units < 1:
+        raise ValueError("the number of units must be >= 1")
+    manifest = {
+        'input_file': os.path.abspath(input_file),
+        'input_kind': 'topology' if topology else 'simon',
+        'input_size': os.path.getsize(input_file),
+        'threshold': path_analyzer.REGENERATOR_THRESHOLD,
+        'analyzer_version': path_analyzer.ANALYZER_VERSION,
+        'output_name': output_name,
+        'num_units': num_units,
+        'units': []
+    }
+    if topology:
+        _, access_nodes = topology_paths.load_topology(input_file)
+        manifest['input_sha256'] = _sha256_file(input_file)
+        n = len(access_nodes)
+        for i in range(num_units):
+            lo = n * i // num_units
+            hi = n * (i + 1) // num_units
+            manifest['units'].append({'index': i, 'source_index_range': [lo, hi],
+                                      'sources': len(access_nodes[lo:hi])})
+    else:
+        for i, (start, end) in enumerate(line_aligned_ranges(input_file, num_units)):
+            manifest['units'].append({'index': i, 'byte_range': [start, end],
+                                      'sha256': _range_sha256(input_file, start, end)})
+    return manifest
+
+def part_file_names(manifest, index, parts_dir):
+    stem, _ = os.path.splitext(manifest['output_name'])
+    n = manifest['num_units']
+    base = os.path.join(parts_dir, f"{stem}.part-{index:05d}-of-{n:05d}")
+    return base + ".csv", base + ".json"
+
+def _iter_unit_records(manifest, unit, input_file):
+    if manifest['input_kind'] == 'topology':
+        if _sha256_file(input_file) != manifest['input_sha256']:
+            raise ValueError(f"{input_file} differs from the planned edge list (sha256 mismatch)")
+        adjacency, access_nodes = topology_paths.load_topology(input_file)
+        lo, hi = unit['source_index_range']
+        for source in access_nodes[lo:hi]:
+            yield from topology_paths.paths_from_source(source, adjacency, access_nodes)
+        return
+
+    start, end = unit['byte_range']
+    if _range_sha256(input_file, start, end) != unit['sha256']:
+        raise ValueError(f"{input_file} bytes {start}-{end} differ from the plan (sha256 mismatch)")
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            pos += len(raw)
+            rec = input_parser.parse_simon_line(raw.decode('utf-8').strip())
+            if rec is not None:
+                yield rec
+
+def run_shard(manifest, index, parts_dir, input_file=None):
+    """
+    Analyzes work unit 'index' and writes its part files. Returns the part
+    summary. input_file overrides the manifest's path (the file may live
+    elsewhere on this machine).
+    """
+    if manifest['analyzer_version'] != path_analyzer.ANALYZER_VERSION:
+        raise ValueError(f"plan was made with analyzer version {manifest['analyzer_version']}, "
+                         f"this is {path_analyzer.ANALYZER_VERSION}")
+    if not 0 <= index < manifest['num_units']:
+        raise ValueError(f"unit index must be in 0..{manifest['num_units'] - 1}")
+    unit = manifest['units'][index]
+    input_file = input_file or manifest['input_file']
+    threshold = manifest['threshold']
+    csv_path, json_path = part_file_names(manifest, index, parts_dir)
+
+    totals = path_analyzer.empty_totals()
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = output_formatter.open_csv_writer(csvfile, write_header=False)
+        for rec in _iter_unit_records(manifest, unit, input_file):
+            result = path_analyzer.analyze_path(rec, threshold)
+            writer.writerow(output_formatter.format_csv_row(result))
+            path_analyzer.add_to_totals(totals, result)
+
+    summary = {
+        'index': index,
+        'rows': totals['paths'],
+        'bytes': os.path.getsize(csv_path),
+        'sha256': _sha256_file(csv_path),
+        'totals': totals
+    }
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def _split_ids(text):
+    return text.split(';') if text else []
+
+def merge_shards(manifest, parts_dir, output_csv_path):
+    """
+    Concatenates the verified parts into output_csv_path and returns the
+    network totals, replayed over the rows in order.
+    """
+    summaries = []
+    for index in range(manifest['num_units']):
+        csv_path, json_path = part_file_names(manifest, index, parts_dir)
+        if not os.path.exists(json_path):
+            raise ValueError(f"unit {index} has not been run (missing {json_path})")
+        with open(json_path, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        if _sha256_file(csv_path) != summary['sha256']:
+            raise ValueError(f"{csv_path} does not match its checksum in {json_path}")
+        summaries.append(summary)
+
+    fields = output_formatter.CSV_FIELDNAMES
+    status_col = fields.index('status')
+    regens_col = fields.index('regenerators')
+    opcs_col = fields.index('opcs')
+    residual_col = fields.index('residual_distance')
+
+    totals = path_analyzer.empty_totals()
+    with open(output_csv_path, 'w', newline='', encoding='utf-8') as out:
+        output_formatter.open_csv_writer(out)
+
+        def copied(lines):
+            for line in lines:
+                out.write(line)
+                yield line
+
+        for index in range(manifest['num_units']):
+            csv_path, _ = part_file_names(manifest, index, parts_dir)
+            with open(csv_path, 'r', newline='', encoding='utf-8') as part:
+                # one pass: copy each line to the output and replay the totals
+                for row in csv.reader(copied(part)):
+                    path_analyzer.add_to_totals(totals, {
+                        'status': row[status_col],
+                        'regenerators': _split_ids(row[regens_col]),
+                        'opcs': _split_ids(row[opcs_col]),
+                        'residual_distance': float(row[residual_col])
+                    })
+
+    expected_rows = sum(s['rows'] for s in summaries)
+    if totals['paths'] != expected_rows:
+        raise ValueError(f"merged {totals['paths']} rows, the parts report {expected_rows}")
+    return totals
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="main.py", description="Multi-machine sharded runs.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('plan-shards', help="split the input into N work units and write a manifest")
+    p.add_argument('input_file')
+    p.add_argument('num_units', type=int)
+    p.add_argument('--topology', action='store_true', help="input_file is a topology edge list")
+    p.add_argument('--output', default='path_analysis_output.csv', help="final CSV name")
+    p.add_argument('--manifest', help="manifest path (default: output/<output stem>.plan.json)")
+    p = sub.add_parser('run-shard', help="run one work unit")
+    p.add_argument('manifest')
+    p.add_argument('index', type=int)
+    p.add_argument('--parts-dir', help="where to write the part files (default: next to the manifest)")
+    p.add_argument('--input', help="input file path on this machine, if not the planned one")
+    p = sub.add_parser('merge', help="merge all parts into the final CSV")
+    p.add_argument('manifest')
+    p.add_argument('--parts-dir', help="where the part files are (default: next to the manifest)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'plan-shards':
+        manifest = plan_shards(args.input_file, args.num_units, args.topology, args.output)
+        manifest_path = args.manifest
+        if manifest_path is None:
+            os.makedirs("output", exist_ok=True)
+            stem, _ = os.path.splitext(args.output)
+            manifest_path = os.path.join("output", f"{stem}.plan.json")
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        print(f"Planned {args.num_units} work units. Manifest in {manifest_path}")
+        return
+
+    with open(args.manifest, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    parts_dir = args.parts_dir or os.path.dirname(os.path.abspath(args.manifest))
+
+    if args.command == 'run-shard':
+        summary = run_shard(manifest, args.index, parts_dir, args.input)
+        csv_path, _ = part_file_names(manifest, args.index, parts_dir)
+        print(f"Unit {args.index}: {path_analyzer.format_totals(summary['totals'])}. Part in {csv_path}")
+        return
+
+    os.makedirs("output", exist_ok=True)
+    out_path = os.path.join("output", manifest['output_name'])
+    totals = merge_shards(manifest, parts_dir, out_path)
+    stem, _ = os.path.splitext(out_path)
+    with open(f"{stem}.totals.json", 'w', encoding='utf-8') as f:
+        json.dump(totals, f, indent=2)
+    print(f"Analysis complete. {path_analyzer.format_totals(totals)}. Results in {out_path}")
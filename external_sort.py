@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+external_sort.py
+
+Sorts analysis results into a CSV when they don't fit in memory (external
+merge sort):
+
+  1) results are formatted into CSV rows and buffered until the buffer
+     reaches the memory budget,
+  2) each full buffer is sorted and spilled to a temporary "run" file,
+  3) the runs are k-way merged (heapq.merge) into the final CSV. If there
+     are more than 'fan_in' runs, groups of them are merged into bigger runs
+     first, so the number of open files stays bounded.
+
+Runs are plain CSV files whose first two columns are the sort key and the
+input index; the index breaks ties, so equal keys keep input order (same as
+a stable in-memory sort). Sort fields are those of result_ranking.RANK_FIELDS.
+Temporary files go to tmp_dir (default: the system temp dir, i.e. $TMPDIR)
+and are removed afterwards.
+"""
+
+import csv
+import heapq
+import os
+import shutil
+import tempfile
+
+import output_formatter
+import result_ranking
+
+# rough per-row overhead of the buffered Python objects, on top of the text
+ROW_OVERHEAD_BYTES = 400
+
+def _parse_key(text):
+    # every rank field is numeric; ints stay ints so the output keeps them exact
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def _write_run(rows, run_dir, run_index):
+    rows.sort(key=lambda row: (row[0], row[1]))
+    path = os.path.join(run_dir, f"run-{run_index:06d}.csv")
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+    return path
+
+def _read_run(path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            row[0] = _parse_key(row[0])
+            row[1] = int(row[1])
+            yield row
+
+def _merge(paths):
+    return heapq.merge(*(_read_run(p) for p in paths), key=lambda row: (row[0], row[1]))
+
+def _merge_to_run(paths, run_dir, run_index):
+    path = os.path.join(run_dir, f"run-{run_index:06d}.csv")
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(_merge(paths))
+    for p in paths:
+        os.remove(p)
+    return path
+
+def external_sort_to_csv(results, output_csv_path, by, descending=False,
+                         memory_budget_bytes=256*1024*1024, fan_in=64, tmp_dir=None):
+    """
+    Writes 'results' (any iterable, consumed once) to output_csv_path sorted
+    by 'by'. Returns { 'rows': int, 'runs': int }.
+    """
+    key = result_ranking.rank_key(by)
+    sign = -1 if descending else 1
+    fieldnames = output_formatter.CSV_FIELDNAMES
+
+    run_dir = tempfile.mkdtemp(prefix='nparc-sort-', dir=tmp_dir)
+    try:
+        runs = []
+        buffer = []
+        buffered_bytes = 0
+        rows = 0
+        for seq, result in enumerate(results):
+            formatted = output_formatter.format_csv_row(result)
+            row = [sign * key(result), seq] + [formatted[k] for k in fieldnames]
+            buffer.append(row)
+            buffered_bytes += ROW_OVERHEAD_BYTES + sum(len(str(v)) for v in row)
+            rows += 1
+            if buffered_bytes >= memory_budget_bytes:
+                runs.append(_write_run(buffer, run_dir, len(runs)))
+                buffer = []
+                buffered_bytes = 0
+        num_runs = len(runs) + (1 if buffer else 0)
+
+        if not runs:
+            # everything fit in the budget: no spill needed
+            buffer.sort(key=lambda row: (row[0], row[1]))
+            merged = buffer
+        else:
+            if buffer:
+                runs.append(_write_run(buffer, run_dir, len(runs)))
+                buffer = []
+            next_index = len(runs)
+            while len(runs) > fan_in:
+                merged_runs = []
+                for start in range(0, len(runs), fan_in):
+                    merged_runs.append(_merge_to_run(runs[start:start + fan_in], run_dir, next_index))
+                    next_index += 1
+                runs = merged_runs
+            merged = _merge(runs)
+
+        with open(output_csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            for row in merged:
+                writer.writerow(row[2:])
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    return {'rows': rows, 'runs': num_runs}
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+fuzz_harness.py
+
+Differential fuzzing of alternative analysis engines against the reference
+path_analyzer.analyze_path().
+
+Every faster engine has to reproduce analyze_path() exactly, including its
+edge cases (full_n < 3, sections with fewer than 3 nodes, UNREACHABLE at an
+invalid index, the residual fallback, repeated node IDs, node ID 0, hops of
+exactly the threshold, ...). This harness:
+
+  1) builds a corpus of adversarial records plus randomized records,
+  2) runs each record through the oracle and the candidate engine,
+  3) shrinks every mismatch to a minimal reproducer (fewest hops, simplest
+     distances and node IDs that still disagree),
+  4) times both engines over the same corpus.
+
+Engines are called as engine(path_record, threshold) and must return an
+AnalysisResult (or an equivalent dict). Batch engines are called as
+engine(path_records, threshold) and return a list of results.
+
+Usage:
+  python fuzz_harness.py [--engine NAME | --engine module:function [--batch]]
+                         [--cases N] [--seed S] [--threshold T ...]
+
+  NAME is one of the built-in ENGINES below.
+"""
+
+import argparse
+import importlib
+import random
+import sys
+import time
+
+import path_analyzer
+import shm_analysis
+import tree_engine
+from records import PathRecord
+
+# name -> (function, is_batch)
+ENGINES = {
+    'reference': (path_analyzer.analyze_path, False),
+    'dict-input': (lambda rec, threshold: path_analyzer.analyze_path(rec.as_dict(), threshold), False),
+    'tree': (tree_engine.analyze_all_paths_tree, True),
+    'shm': (lambda recs, threshold: shm_analysis.analyze_all_paths_shared(recs, threshold, workers=2), True),
+    'half-hint': (path_analyzer.analyze_path, False),
+}
+
+DEFAULT_THRESHOLDS = [1500.0, 2000.0]
+
+def make_record(node_ids, distances):
+    """
+    node_ids / distances in the parser's layout (last distance 0.0).
+    The true source and destination are the first and last node.
+    """
+    source = node_ids[0] if node_ids else 0
+    destination = node_ids[-1] if node_ids else 0
+    return PathRecord(source, destination, sum(distances), node_ids, distances)
+
+def with_half_hint(rec):
+    """
+    A copy of rec carrying a Simon-style "(Half: ... at N)" hint: the first
+    node nearest to half of the full path's length.
+    """
+    node_ids = list(rec.node_ids)
+    distances = list(rec.distances)
+    half = sum(distances) / 2.0
+    acc = 0.0
+    best = -1
+    best_diff = None
+    for i, d in enumerate(distances):
+        if best_diff is None or abs(acc - half) < best_diff:
+            best_diff = abs(acc - half)
+            best = i
+        acc += d
+    return PathRecord(rec.source, rec.destination, rec.total_cost, node_ids, distances, None, best)
+
+# engine name -> per-record corpus transformation, applied once before anything
+# is timed (the oracle sees the same records; it ignores the hint)
+PREPARE = {
+    'half-hint': with_half_hint,
+}
+
+def adversarial_records(threshold):
+    """
+    Hand-picked edge cases around the rules in analyze_path().
+    """
+    T = threshold
+    cases = [
+        # full_n < 3
+        ([], []),
+        ([1], [0.0]),
+        ([1, 2], [0.01, 0.0]),
+        # sub_n == 1 and sub_n == 2 (no room for OPCs)
+        ([1, 10, 2], [0.01, 0.01, 0.0]),
+        ([1, 10, 11, 2], [0.01, 500.0, 0.01, 0.0]),
+        # sub_n == 3 with the total at, just below and just above the threshold
+        ([1, 10, 11, 12, 2], [0.01, T / 2, T / 2, 0.01, 0.0]),
+        ([1, 10, 11, 12, 2], [0.01, T / 2, T / 2 - 0.01, 0.01, 0.0]),
+        ([1, 10, 11, 12, 2], [0.01, T / 2, T / 2 + 0.01, 0.01, 0.0]),
+        # first hop above threshold => regenerator at the source ROADM => UNREACHABLE
+        ([1, 10, 11, 12, 2], [0.01, T + 1.0, 10.0, 0.01, 0.0]),
+        # hop above threshold after a regenerator
+        ([1, 10, 11, 12, 13, 2], [0.01, 100.0, T - 50.0, T + 1.0, 0.01, 0.0]),
+        # hops of exactly the threshold
+        ([1, 10, 11, 12, 13, 2], [0.01, T, T, T, 0.01, 0.0]),
+        # zero-length hops and midpoint ties
+        ([1, 10, 11, 12, 13, 14, 2], [0.01, 0.0, 0.0, T / 4, T / 4, 0.01, 0.0]),
+        ([1, 10, 11, 12, 13, 2], [0.01, 300.0, 0.0, 300.0, 0.01, 0.0]),
+        # regenerator section with fewer than 3 nodes
+        ([1, 10, 11, 12, 13, 2], [0.01, T - 1.0, T - 1.0, 10.0, 0.01, 0.0]),
+        # node ID 0 as a candidate OPC site, with and without regenerators
+        ([1, 10, 0, 12, 2], [0.01, 400.0, 400.0, 0.01, 0.0]),
+        ([1, 10, 0, 12, 13, 14, 2], [0.01, 400.0, 400.0, T - 100.0, 50.0, 0.01, 0.0]),
+        # repeated node IDs (loops) and source/destination reappearing inside the path
+        ([1, 10, 11, 10, 12, 2], [0.01, 700.0, 700.0, 700.0, 0.01, 0.0]),
+        ([1, 10, 1, 11, 12, 2], [0.01, 900.0, 900.0, 900.0, 0.01, 0.0]),
+        ([1, 10, 11, 12, 11, 13, 14, 2], [0.01, 900.0, 900.0, 900.0, 900.0, 900.0, 0.01, 0.0]),
+        # duplicate consecutive pair with different distances (distance lookup picks the first)
+        ([1, 10, 11, 10, 11, 12, 2], [0.01, 100.0, 200.0, 300.0, 400.0, 0.01, 0.0]),
+    ]
+    return [make_record(list(n), list(d)) for n, d in cases]
+
+def random_record(rng, threshold):
+    """
+    A random path: mostly realistic (unique nodes, km-scale hops), with a
+    fraction of repeated nodes, zero hops and threshold-sized hops mixed in.
+    """
+    full_n = rng.choice([0, 1, 2, 3, 4, 5]) if rng.random() < 0.1 else rng.randint(3, 16)
+    node_pool = 8 if rng.random() < 0.2 else 1000
+    node_ids = [rng.randrange(node_pool) for _ in range(full_n)]
+    palette = [0.0, 0.01, threshold / 2, threshold, threshold + 0.01, threshold - 0.01]
+    distances = []
+    for i in range(full_n):
+        if i == full_n - 1:
+            distances.append(0.0)
+        elif i == 0 or i == full_n - 2:
+            distances.append(0.01 if rng.random() < 0.9 else rng.choice(palette))
+        elif rng.random() < 0.15:
+            distances.append(rng.choice(palette))
+        else:
+            distances.append(round(rng.uniform(10.0, threshold * 0.9), 2))
+    return make_record(node_ids, distances)
+
+def random_family(rng, threshold):
+    """
+    Several paths from one source that share prefixes of a random base route
+    (like the per-source trees of an all-pairs dump), branching off it at
+    random points and ending at different destinations.
+    """
+    base = random_record(rng, threshold)
+    base_nodes = list(base.node_ids)
+    base_dists = list(base.distances)
+    if len(base_nodes) < 4:
+        return [base]
+    source = base_nodes[0]
+    used = set(base_nodes)
+    family = [base]
+    for _ in range(rng.randint(1, 6)):
+        cut = rng.randint(2, len(base_nodes) - 1)
+        nodes = base_nodes[:cut]
+        dists = base_dists[:cut - 1]
+        for _ in range(rng.randint(0, 3)):
+            nd = max(used) + 1
+            used.add(nd)
+            dists.append(round(rng.uniform(0.0, threshold), 2))
+            nodes.append(nd)
+        dest = max(used) + 1
+        used.add(dest)
+        dists.extend([0.01, 0.0])
+        nodes.append(dest)
+        nodes[0] = source
+        family.append(make_record(nodes, dists))
+    return family
+
+def build_corpus(cases, seed, thresholds):
+    """
+    Returns a list of (record, threshold) pairs.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for threshold in thresholds:
+        for rec in adversarial_records(threshold):
+            corpus.append((rec, threshold))
+    while len(corpus) < cases:
+        threshold = rng.choice(thresholds)
+        if rng.random() < 0.5:
+            corpus.append((random_record(rng, threshold), threshold))
+        else:
+            for rec in random_family(rng, threshold):
+                corpus.append((rec, threshold))
+    return corpus
+
+def as_comparable(result):
+    return result.as_dict() if hasattr(result, 'as_dict') else dict(result)
+
+def run_engine(engine, is_batch, corpus):
+    """
+    Runs the engine over the corpus (grouped per threshold for batch engines).
+    Returns (results in corpus order, seconds).
+    """
+    start = time.perf_counter()
+    if is_batch:
+        results = [None] * len(corpus)
+        by_threshold = {}
+        for idx, (rec, threshold) in enumerate(corpus):
+            by_threshold.setdefault(threshold, []).append(idx)
+        for threshold, idxs in by_threshold.items():
+            out = engine([corpus[i][0] for i in idxs], threshold)
+            for i, res in zip(idxs, out):
+                results[i] = res
+    else:
+        results = [engine(rec, threshold) for rec, threshold in corpus]
+    return results, time.perf_counter() - start
+
+def call_one(engine, is_batch, rec, threshold):
+    try:
+        if is_batch:
+            return as_comparable(engine([rec], threshold)[0])
+        return as_comparable(engine(rec, threshold))
+    except Exception as exc:  # a crash is a mismatch too
+        return {'error': repr(exc)}
+
+def oracle(rec, threshold):
+    # the reference scan; a record's Simon half-way hint is not used
+    return path_analyzer.analyze_path(rec, threshold, use_half_hint=False)
+
+def disagrees(engine, is_batch, rec, threshold):
+    oracle_result = as_comparable(oracle(rec, threshold))
+    return oracle_result != call_one(engine, is_batch, rec, threshold)
+
+def shrink(engine, is_batch, rec, threshold, prepare=None):
+    """
+    Greedy shrinking: keep applying simplifications that preserve the
+    mismatch until none applies. Simplifications, in order:
+      - drop one node (and its hop)
+      - replace a distance by 0.0, a round number, or half of it
+      - renumber node IDs to small integers
+    """
+    node_ids = list(rec.node_ids)
+    distances = list(rec.distances)
+
+    def rebuild(n, d):
+        small = make_record(n, d)
+        return prepare(small) if prepare else small
+
+    def still_fails(n, d):
+        return disagrees(engine, is_batch, rebuild(n, d), threshold)
+
+    changed = True
+    while changed:
+        changed = False
+
+        for i in range(len(node_ids)):
+            n = node_ids[:i] + node_ids[i+1:]
+            d = distances[:i] + distances[i+1:]
+            if d:
+                d[-1] = 0.0
+            if still_fails(n, d):
+                node_ids, distances = n, d
+                changed = True
+                break
+        if changed:
+            continue
+
+        for i in range(len(distances) - 1):
+            for simpler in (0.0, float(round(distances[i], -2)), float(round(distances[i])), distances[i] / 2):
+                if simpler == distances[i]:
+                    continue
+                d = distances[:i] + [simpler] + distances[i+1:]
+                if still_fails(node_ids, d):
+                    distances = d
+                    changed = True
+                    break
+            if changed:
+                break
+        if changed:
+            continue
+
+        renumber = {}
+        for nd in node_ids:
+            renumber.setdefault(nd, len(renumber) + 1)
+        n = [renumber[nd] for nd in node_ids]
+        if n != node_ids and still_fails(n, distances):
+            node_ids = n
+            changed = True
+
+    return rebuild(node_ids, distances)
+
+def certify(engine, is_batch=False, cases=20000, seed=0, thresholds=None, max_reports=5, out=sys.stdout,
+            prepare=None):
+    """
+    Runs the differential check. Returns the list of minimal reproducers
+    (PathRecord, threshold); an empty list means the engine matched the oracle
+    on the whole corpus.
+    """
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    corpus = build_corpus(cases, seed, thresholds)
+    if prepare:
+        corpus = [(prepare(rec), threshold) for rec, threshold in corpus]
+
+    oracle_results, oracle_secs = run_engine(oracle, False, corpus)
+    try:
+        engine_results, engine_secs = run_engine(engine, is_batch, corpus)
+    except Exception as exc:
+        print(f"Engine crashed on the full corpus ({exc!r}); checking record by record.", file=out)
+        engine_results = [call_one(engine, is_batch, rec, t) for rec, t in corpus]
+        engine_secs = float('nan')
+
+    mismatches = []
+    for (rec, threshold), expected, got in zip(corpus, oracle_results, engine_results):
+        if as_comparable(expected) != as_comparable(got):
+            mismatches.append((rec, threshold))
+
+    print(f"{len(corpus)} records, {len(mismatches)} mismatches", file=out)
+    print(f"reference: {oracle_secs:.3f} s, engine: {engine_secs:.3f} s "
+          f"(speedup x{oracle_secs / engine_secs if engine_secs else float('inf'):.2f})", file=out)
+
+    reproducers = []
+    seen = set()
+    for rec, threshold in mismatches:
+        small = shrink(engine, is_batch, rec, threshold, prepare)
+        key = (tuple(small.node_ids), tuple(small.distances), threshold)
+        if key in seen:
+            continue
+        seen.add(key)
+        reproducers.append((small, threshold))
+        if len(reproducers) <= max_reports:
+            print(f"\nMismatch (threshold={threshold}):", file=out)
+            print(f"  nodes:    {list(small.node_ids)}", file=out)
+            print(f"  dists:    {list(small.distances)}", file=out)
+            print(f"  expected: {as_comparable(oracle(small, threshold))}", file=out)
+            print(f"  got:      {call_one(engine, is_batch, small, threshold)}", file=out)
+    return reproducers
+
+def load_engine(spec, is_batch):
+    if spec in ENGINES:
+        return ENGINES[spec]
+    module_name, _, func_name = spec.partition(':')
+    if not func_name:
+        raise SystemExit(f"unknown engine {spec!r}; use one of {sorted(ENGINES)} or module:function")
+    module = importlib.import_module(module_name)
+    return getattr(module, func_name), is_batch
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential fuzzing of analysis engines against analyze_path().")
+    parser.add_argument("--engine", default="dict-input",
+                        help=f"built-in engine ({', '.join(sorted(ENGINES))}) or module:function")
+    parser.add_argument("--batch", action="store_true",
+                        help="module:function takes (path_records, threshold) and returns a list")
+    parser.add_argument("--cases", type=int, default=20000, help="approximate corpus size (adversarial cases plus random records)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threshold", type=float, action="append",
+                        help="threshold(s) to test (repeatable, default 1500 and 2000)")
+    args = parser.parse_args()
+
+    engine, is_batch = load_engine(args.engine, args.batch)
+    reproducers = certify(engine, is_batch, args.cases, args.seed, args.threshold,
+                          prepare=PREPARE.get(args.engine))
+    sys.exit(1 if reproducers else 0)
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 input_parser.py
 
 Parses each line of the Simon output file. The format is:
-   SRC->DST (Cost: X) n0 (dist0) n1 (dist1) n2 (dist2) ... nK (distK) FINAL_NODE (LinkCount: Y)
+   SRC->DST (Cost: X) n0 (dist0) n1 (dist1) n2 (dist2) ... nK (distK) FINAL_NODE (LinkCount: Y) [(Half: ...)]
 
 Where each "nI (distI)" means:
     "nI" is a node ID
@@ -11,152 +11,226 @@ Where each "nI (distI)" means:
 After the last pair "nK (distK)", the line has a trailing node (FINAL_NODE)
 which is the ultimate destination, with no parentheses since there's no next node.
 
+Simon may end the line with
+   (Half: X between A and B for Y at N)
+i.e. the half-way point X of the path lies on the link A-B, and N is the node
+nearest to it, with |left - right| = Y there. Only N is kept, as its position
+on the path (PathRecord.half_index); analyze_path() uses it as a hint for the
+single-OPC placement.
+
 Example:
   1->24 (Cost: 6320.02) 1 (0.01) 25 (1040.00) 30 (1200.00) ... 48 (0.01) 24 (LinkCount: 8)
 
-We produce a list of path_records, each a dict:
-{
-  'source': int,
-  'destination': int,
-  'total_cost': float,
-  'nodes': [ (nodeID, distanceToNext), (nodeID, distanceToNext), ..., (finalNode, 0.0) ],
-  'unparsed_line': str
-}
+We produce a list of path_records, each a records.PathRecord with:
+  source, destination, total_cost
+  node_ids:  array of nodeIDs, ending with finalNode
+  distances: array of distanceToNext, ending with 0.0 for finalNode
+  unparsed_line: the original line, only if keep_lines=True (else None)
+  half_index: index of the "(Half: ... at N)" node in node_ids, or -1
+
+PathRecord still reads like the old dict, e.g. record['nodes'] gives
+  [ (nodeID, distanceToNext), (nodeID, distanceToNext), ..., (finalNode, 0.0) ]
 """
 
 import re
 
-def parse_simon_output_file(filepath):
+from records import PathRecord, is_reverse_route, share_reverse_route
+
+# Regex for the initial "SRC->DST (Cost: XXX)" part
+line_pattern = re.compile(
+    r'^(\d+)->(\d+)\s+\(Cost:\s*([\d\.]+)\)\s+(.*)$'
+)
+# Regex to match pairs of the form:  NNN (NNN.NN)
+# e.g.  25 (1040.00),  48 (0.01)
+node_pair_pattern = re.compile(r'(\d+)\s*\(\s*([\d\.]+)\s*\)')
+
+# We may want to remove trailing (LinkCount: X) text at the end:
+linkcount_pattern = re.compile(r'\(LinkCount:\s*\d+\)', re.IGNORECASE)
+
+# The optional trailing "(Half: X between A and B for Y at N)"
+half_pattern = re.compile(
+    r'\(Half:\s*([\d\.]+)\s+between\s+(\d+)\s+and\s+(\d+)\s+for\s+([\d\.]+)\s+at\s+(\d+)\s*\)'
+)
+
+def parse_simon_line(line, keep_line=False):
     """
-    Parses the entire file into a list of path dictionaries.
+    Parses one (already stripped) line into a PathRecord.
+    Returns None for blank/comment lines and lines that don't match the format.
     """
-
-    # Regex for the initial "SRC->DST (Cost: XXX)" part
-    line_pattern = re.compile(
-        r'^(\d+)->(\d+)\s+\(Cost:\s*([\d\.]+)\)\s+(.*)$'
+    if not line or line.startswith("#"):
+        return None
+
+    m = line_pattern.match(line)
+    if not m:
+        # Could not match the basic line structure, skip
+        return None
+
+    src_str, dst_str, cost_str, remainder = m.groups()
+    source = int(src_str)
+    destination = int(dst_str)
+    try:
+        total_cost = float(cost_str)
+    except ValueError:
+        total_cost = 0.0
+
+    # Take off the trailing (Half: ...) if present, keeping its "at N" node
+    half_node = None
+    h = remainder.rfind('(Half:')
+    if h >= 0:
+        hm = half_pattern.match(remainder, h)
+        if hm:
+            half_node = int(hm.group(5))
+            remainder = remainder[:h] + remainder[hm.end():]
+
+    # Remove the trailing (LinkCount: X) if present
+    remainder = linkcount_pattern.sub('', remainder).strip()
+
+    # Now parse all the "node (distance)" pairs
+    pairs = node_pair_pattern.findall(remainder)
+    # each element of pairs is (nodeID_str, distance_str)
+
+    # We also need the final node (which is typically a raw integer without parentheses) at the end
+    # e.g. "48 (0.01) 24"
+    # After removing those pairs, the last token should be that final node
+    # We'll do a quick trick: we can remove each matched substring from a local copy
+    # but simpler might be to do a big split and compare.
+    # We'll just re-split the remainder by whitespace and see what's left after the pairs.
+
+    # First, build a list of nodeIDs and distances from the pairs
+    node_list = []
+    dist_list = []
+    half_index = -1
+    for (nid_str, dist_str) in pairs:
+        nid = int(nid_str)
+        dist_val = float(dist_str)
+        if nid == half_node and half_index < 0:
+            half_index = len(node_list)
+        node_list.append(nid)
+        dist_list.append(dist_val)
+
+    # We must figure out the leftover final node
+    # One approach: re-split 'remainder' on whitespace, then remove pairs
+    # Or simpler approach: the final node is typically the last integer in 'remainder' that's not in parentheses
+    tokens = remainder.split()
+    # We'll find the last integer not matched by node_pair_pattern
+
+    # Because each pair is "N (D)", let's do a simpler approach: after the last pair, the next token should be the final node:
+    # Example remainder: "1 (0.01) 25 (1040.00) 30 (1200.00) ... 48 (0.01) 24"
+    # pairs => [("1","0.01"),("25","1040.00"), ...("48","0.01")]
+    # final node => "24"
+
+    # Let's locate the last pair string in the remainder, then see what's after it
+    final_node_id = destination  # fallback if we fail logic
+    if pairs:
+        # last pair is pairs[-1], let's see the node ID
+        last_pair_str = f"{pairs[-1][0]} ({pairs[-1][1]}"
+        # that occurs in remainder, we take the substring after that
+        idx = remainder.rfind(last_pair_str)
+        if idx >= 0:
+            after_str = remainder[idx + len(last_pair_str):].strip()
+            # e.g. after_str might start with a closing parenthesis ) plus space, then the final node
+            after_str = after_str.lstrip(" )\t")
+            # hopefully the first token is the final node
+            # try to parse an int from that
+            leftover_tokens = after_str.split(None, 1)
+            if leftover_tokens:
+                try:
+                    final_node_id = int(leftover_tokens[0])
+                except ValueError:
+                    final_node_id = destination  # fallback
+    else:
+        # no pairs => direct link?
+        # In that rare case, maybe it's "1->2 (Cost: 800.02) 1 (0.01) 2"
+        # pairs => [("1","0.01")]
+        # We'll handle it or fallback
+        pass
+
+    # So now we interpret the path as:
+    # node_list[0] -> node_list[1] has dist_list[0]
+    # node_list[1] -> node_list[2] has dist_list[1]
+    # ...
+    # node_list[K] -> final_node_id has dist_list[K]
+    # Then the final node has distance 0
+    # But watch out if we only have 0 pairs => direct link from source to destination
+    if len(node_list) == 0:
+        # Possibly just the source in parentheses or something minimal
+        # We'll treat this as direct link from src to dst
+        # The user might have e.g. "1 (0.01) 2"
+        # Hard to parse. We'll fallback
+        node_list = [source, destination]
+        dist_list = [0.0, 0.0]
+        half_index = -1
+    else:
+        # We do node_list[0..K], plus the final node with distance=0
+        if final_node_id == half_node and half_index < 0:
+            half_index = len(node_list)
+        node_list.append(final_node_id)
+        dist_list.append(0.0)
+
+    return PathRecord(
+        source,
+        destination,
+        total_cost,
+        node_list,
+        dist_list,
+        line if keep_line else None,
+        half_index
     )
-    # Regex to match pairs of the form:  NNN (NNN.NN)
-    # e.g.  25 (1040.00),  48 (0.01)
-    node_pair_pattern = re.compile(r'(\d+)\s*\(\s*([\d\.]+)\s*\)')
 
-    # We may want to remove trailing (LinkCount: X) text at the end:
-    linkcount_pattern = re.compile(r'\(LinkCount:\s*\d+\)', re.IGNORECASE)
+def parse_simon_output_file(filepath, keep_lines=False, share_reverse=True, stats=None):
+    """
+    Parses the entire file into a list of PathRecords.
 
+    All-pairs files usually hold both A->B and B->A over the same route
+    reversed. With share_reverse=True such a pair stores the route only once:
+    the B->A record reads it through reversed views (records.share_reverse_route),
+    so the analysis still walks it from B's end. If a dict is passed as
+    'stats', it gets 'paths' and 'shared_pairs'.
+    """
     path_records = []
+    by_pair = {}  # (source, destination) -> latest record
+    shared_pairs = 0
 
     with open(filepath, 'r', encoding='utf-8') as f:
         for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-
-            m = line_pattern.match(line)
-            if not m:
-                # Could not match the basic line structure, skip
-                continue
-
-            src_str, dst_str, cost_str, remainder = m.groups()
-            source = int(src_str)
-            destination = int(dst_str)
-            try:
-                total_cost = float(cost_str)
-            except ValueError:
-                total_cost = 0.0
-
-            # Remove the trailing (LinkCount: X) if present
-            remainder = linkcount_pattern.sub('', remainder).strip()
-
-            # Now parse all the "node (distance)" pairs
-            pairs = node_pair_pattern.findall(remainder)
-            # each element of pairs is (nodeID_str, distance_str)
-
-            # We also need the final node (which is typically a raw integer without parentheses) at the end
-            # e.g. "48 (0.01) 24"
-            # After removing those pairs, the last token should be that final node
-            # We'll do a quick trick: we can remove each matched substring from a local copy
-            # but simpler might be to do a big split and compare.
-            # We'll just re-split the remainder by whitespace and see what's left after the pairs.
-
-            # First, build a list of nodeIDs and distances from the pairs
-            node_list = []
-            dist_list = []
-            for (nid_str, dist_str) in pairs:
-                nid = int(nid_str)
-                dist_val = float(dist_str)
-                node_list.append(nid)
-                dist_list.append(dist_val)
-
-            # We must figure out the leftover final node
-            # One approach: re-split 'remainder' on whitespace, then remove pairs
-            # Or simpler approach: the final node is typically the last integer in 'remainder' that's not in parentheses
-            tokens = remainder.split()
-            # We'll find the last integer not matched by node_pair_pattern
-
-            # Because each pair is "N (D)", let's do a simpler approach: after the last pair, the next token should be the final node:
-            # Example remainder: "1 (0.01) 25 (1040.00) 30 (1200.00) ... 48 (0.01) 24"
-            # pairs => [("1","0.01"),("25","1040.00"), ...("48","0.01")]
-            # final node => "24"
-
-            # Let's locate the last pair string in the remainder, then see what's after it
-            final_node_id = destination  # fallback if we fail logic
-            if pairs:
-                # last pair is pairs[-1], let's see the node ID
-                last_pair_str = f"{pairs[-1][0]} ({pairs[-1][1]}"
-                # that occurs in remainder, we take the substring after that
-                idx = remainder.rfind(last_pair_str)
-                if idx >= 0:
-                    after_str = remainder[idx + len(last_pair_str):].strip()
-                    # e.g. after_str might start with a closing parenthesis ) plus space, then the final node
-                    after_str = after_str.lstrip(" )\t")
-                    # hopefully the first token is the final node
-                    # try to parse an int from that
-                    leftover_tokens = after_str.split(None, 1)
-                    if leftover_tokens:
-                        try:
-                            final_node_id = int(leftover_tokens[0])
-                        except ValueError:
-                            final_node_id = destination  # fallback
-            else:
-                # no pairs => direct link?
-                # In that rare case, maybe it's "1->2 (Cost: 800.02) 1 (0.01) 2"
-                # pairs => [("1","0.01")]
-                # We'll handle it or fallback
-                pass
-
-            # So now we interpret the path as:
-            # node_list[0] -> node_list[1] has dist_list[0]
-            # node_list[1] -> node_list[2] has dist_list[1]
-            # ...
-            # node_list[K] -> final_node_id has dist_list[K]
-            # Then the final node has distance 0
-            # But watch out if we only have 0 pairs => direct link from source to destination
-            full_nodes = []
-            if len(node_list) == 0:
-                # Possibly just the source in parentheses or something minimal
-                # We'll treat this as direct link from src to dst
-                # The user might have e.g. "1 (0.01) 2"
-                # Hard to parse. We'll fallback
-                full_nodes = [(source, 0.0), (destination, 0.0)]
-            else:
-                # We do node_list[0..K], plus final node
-                # Distances => dist_list[0..K]
-                # We'll place them as (node, distanceToNext)
-                K = len(node_list)
-                # e.g. if K=8, we have node_list[0..7], dist_list[0..7]
-                for i in range(K):
-                    nd = node_list[i]
-                    dist_to_next = dist_list[i]
-                    full_nodes.append((nd, dist_to_next))
-                # now append the final node with distance=0
-                full_nodes.append((final_node_id, 0.0))
-
-            path_dict = {
-                'source': source,
-                'destination': destination,
-                'total_cost': total_cost,
-                'nodes': full_nodes,  # list of (nodeID, distanceToNext)
-                'unparsed_line': line
-            }
-            path_records.append(path_dict)
-
-    return path_records
\ No newline at end of file
+            path_record = parse_simon_line(line.strip(), keep_lines)
+            if path_record is not None:
+                if share_reverse:
+                    other = by_pair.get((path_record.destination, path_record.source))
+                    if other is not None and is_reverse_route(other, path_record):
+                        share_reverse_route(other, path_record)
+                        shared_pairs += 1
+                    by_pair[(path_record.source, path_record.destination)] = path_record
+                path_records.append(path_record)
+
+    if stats is not None:
+        stats['paths'] = len(path_records)
+        stats['shared_pairs'] = shared_pairs
+    return path_records
+
+def parse_simon_lines(lines, keep_lines=False):
+    """
+    Parses a batch of raw lines, skipping the ones that aren't path lines.
+    """
+    path_records = []
+    for line in lines:
+        path_record = parse_simon_line(line.strip(), keep_lines)
+        if path_record is not None:
+            path_records.append(path_record)
+    return path_records
+
+def iter_simon_output_file(filepath, start_offset=0, keep_lines=False):
+    """
+    Streams the file from byte offset 'start_offset' (which must be at a line
+    start), yielding (path_record, end_offset) where end_offset is the byte
+    offset just past the line the record came from. Passing the last
+    end_offset back as start_offset continues right after that record.
+    """
+    offset = start_offset
+    with open(filepath, 'rb') as f:
+        f.seek(start_offset)
+        for raw in f:
+            offset += len(raw)
+            path_record = parse_simon_line(raw.decode('utf-8').strip(), keep_lines)
+            if path_record is not None:
+                yield path_record, offset
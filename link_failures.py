@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+link_failures.py
+
+Single-link-failure survivability sweep, using only the parsed Simon paths.
+
+  1) The network graph is rebuilt from the path records' hops
+     (node, distanceToNext); access nodes are the paths' endpoints.
+  2) For every link, the pairs whose path uses it are "affected". Only
+     those pairs are rerouted, incrementally: each affected source's
+     shortest-path tree on the intact network is computed once
+     (topology_paths.shortest_paths_from) and kept. If the failed link isn't
+     one of its tree edges the tree still holds; otherwise only the subtree
+     hanging below the link is recomputed (repair_tree), seeded from the
+     subtree's neighbours outside it. The repaired routes are the ones a
+     fresh Dijkstra without the link would find, ties included.
+  3) The rerouted paths go through analyze_path(), and each failure is
+     compared with the intact network:
+       - affected_pairs       pairs whose path crossed the link
+       - disconnected_pairs   affected pairs with no route left
+       - newly_unreachable    pairs that were OK and are now UNREACHABLE or
+                              disconnected
+       - regenerators_before / regenerators_after over the affected pairs
+         (after: rerouted OK paths only), and network_regenerators, the
+         network-wide regenerator demand with the link down
+Failures are independent, so they run in a process pool; the report keeps
+link order. Each worker keeps the intact trees of the sources it has seen.
+"""
+
+import heapq
+import multiprocessing
+
+import path_analyzer
+import topology_paths
+from records import path_arrays
+
+def topology_from_paths(path_records):
+    """
+    Returns (adjacency, access_nodes, links): adjacency and access_nodes in
+    topology_paths' layout, links as { (u, v) with u <= v: km }, one entry
+    per node pair (the shortest distance seen for it).
+    """
+    links = {}
+    access_nodes = set()
+    for rec in path_records:
+        node_ids, distances = path_arrays(rec)
+        if len(node_ids) < 2:
+            continue
+        access_nodes.add(node_ids[0])
+        access_nodes.add(node_ids[-1])
+        for i in range(len(node_ids) - 1):
+            u = node_ids[i]
+            v = node_ids[i+1]
+            key = (u, v) if u <= v else (v, u)
+            km = distances[i]
+            if key not in links or km < links[key]:
+                links[key] = km
+
+    adjacency = {}
+    for (u, v), km in links.items():
+        adjacency.setdefault(u, []).append((v, km))
+        adjacency.setdefault(v, []).append((u, km))
+    return adjacency, sorted(access_nodes), links
+
+def paths_by_link(path_records):
+    """
+    { (u, v) with u <= v: [path index, ...] } for every link a path crosses.
+    """
+    by_link = {}
+    for idx, rec in enumerate(path_records):
+        node_ids, _ = path_arrays(rec)
+        seen = set()
+        for i in range(len(node_ids) - 1):
+            u = node_ids[i]
+            v = node_ids[i+1]
+            key = (u, v) if u <= v else (v, u)
+            if key not in seen:
+                seen.add(key)
+                by_link.setdefault(key, []).append(idx)
+    return by_link
+
+def shortest_path_tree(source, adjacency, access_set):
+    """
+    (dist, prev, children) of the intact network's shortest-path tree from
+    'source'; children maps a node to the nodes whose predecessor it is.
+    """
+    dist, prev = topology_paths.shortest_paths_from(source, adjacency, access_set)
+    children = {}
+    for node, parent in prev.items():
+        children.setdefault(parent, []).append(node)
+    return dist, prev, children
+
+def repair_tree(source, tree, link, adjacency, access_set):
+    """
+    Shortest paths from 'source' with 'link' down, as (dist, prev) dicts like
+    topology_paths.shortest_paths_from() returns, derived from the intact
+    'tree' (see shortest_path_tree) without touching it.
+
+    Removing a link only lengthens the routes that cross it. If it isn't a
+    tree edge, no tree route does and the tree is returned as is. Otherwise
+    the routes of the subtree below it are the only ones lost: each subtree
+    node is seeded with its best route through a neighbour outside the
+    subtree, and Dijkstra runs inside the subtree alone. Subtree nodes it
+    can't reach are left out of dist (disconnected). Predecessors follow
+    Dijkstra's own tie rule, so the routes are a fresh run's.
+    """
+    dist, prev, children = tree
+    a, b = link
+    if prev.get(b) == a:
+        root = b
+    elif prev.get(a) == b:
+        root = a
+    else:
+        return dist, prev
+
+    cut = {root}
+    stack = [root]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            cut.add(child)
+            stack.append(child)
+
+    def usable(node, neighbor):
+        # predecessors Dijkstra can use: settled nodes it expands (the source
+        # or a ROADM), over any link but the failed one
+        if neighbor != source and neighbor in access_set:
+            return False
+        return not ((node == a and neighbor == b) or (node == b and neighbor == a))
+
+    new_dist = {}
+    heap = []
+    for node in cut:
+        best = None
+        for neighbor, km in adjacency.get(node, ()):
+            if neighbor in cut or neighbor not in dist or not usable(node, neighbor):
+                continue
+            nd = dist[neighbor] + km
+            if best is None or nd < best:
+                best = nd
+        if best is not None:
+            new_dist[node] = best
+            heapq.heappush(heap, (best, node))
+
+    done = set()
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in done:
+            continue
+        done.add(u)
+        if u in access_set:
+            # the source is never in the subtree, so this is an endpoint
+            continue
+        for v, km in adjacency.get(u, ()):
+            if v not in cut or v in done:
+                continue
+            nd = d + km
+            if v not in new_dist or nd < new_dist[v]:
+                new_dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+
+    dist = dict(dist)
+    prev = dict(prev)
+    for node in cut:
+        dist.pop(node, None)
+        prev.pop(node, None)
+    dist.update(new_dist)
+    # Among equal-length routes Dijkstra keeps the predecessor it settled
+    # first, the smallest (distance, node): pick the same one, so the routes
+    # are exactly those of a fresh run without the link.
+    for node in new_dist:
+        best = None
+        for neighbor, km in adjacency.get(node, ()):
+            if neighbor not in dist or not usable(node, neighbor):
+                continue
+            key = (dist[neighbor] + km, dist[neighbor], neighbor)
+            if best is None or key < best:
+                best = key
+        prev[node] = best[2]
+    return dist, prev
+
+def evaluate_failure(link, km, affected, adjacency, access_set, pairs, baseline, network_regenerators, threshold, trees=None):
+    """
+    Reroutes and analyzes the 'affected' path indices with 'link' down.
+    pairs[i] is (source, destination) and baseline[i] the intact result.
+    trees caches the intact shortest-path tree per source across calls.
+    """
+    if trees is None:
+        trees = {}
+    by_source = {}
+    for idx in affected:
+        by_source.setdefault(pairs[idx][0], []).append(idx)
+
+    disconnected = 0
+    newly_unreachable = 0
+    regens_before = 0
+    regens_after = 0
+    for source, idxs in by_source.items():
+        tree = trees.get(source)
+        if tree is None:
+            tree = trees[source] = shortest_path_tree(source, adjacency, access_set)
+        dist, prev = repair_tree(source, tree, link, adjacency, access_set)
+        for i in idxs:
+            destination = pairs[i][1]
+            before = baseline[i]
+            regens_before += len(before['regenerators'])
+            if destination not in dist:
+                disconnected += 1
+                if before['status'] == 'OK':
+                    newly_unreachable += 1
+                continue
+            rec = topology_paths.build_path_record(source, destination, dist, prev, adjacency)
+            after = path_analyzer.analyze_path(rec, threshold)
+            regens_after += len(after['regenerators'])
+            if before['status'] == 'OK' and after['status'] != 'OK':
+                newly_unreachable += 1
+
+    return {
+        'link_a': link[0],
+        'link_b': link[1],
+        'km': km,
+        'affected_pairs': len(affected),
+        'disconnected_pairs': disconnected,
+        'newly_unreachable': newly_unreachable,
+        'regenerators_before': regens_before,
+        'regenerators_after': regens_after,
+        'regenerator_delta': regens_after - regens_before,
+        'network_regenerators': network_regenerators - regens_before + regens_after
+    }
+
+# Worker-process state, set once per process by the pool initializer.
+_worker_state = None
+
+def _init_worker(state):
+    global _worker_state
+    # each process fills its own cache of intact trees
+    _worker_state = dict(state, trees={})
+
+def _worker_evaluate(task):
+    link, km, affected = task
+    s = _worker_state
+    return evaluate_failure(link, km, affected, s['adjacency'], s['access_set'], s['pairs'],
+                            s['baseline'], s['network_regenerators'], s['threshold'], s['trees'])
+
+def sweep_link_failures(path_records, threshold=None, workers=1, include_access_links=False):
+    """
+    Runs one failure per link and returns the list of per-failure reports
+    (see evaluate_failure), ordered by link. Access links are skipped unless
+    include_access_links=True (losing one simply disconnects its access node).
+    """
+    if threshold is None:
+        threshold = path_analyzer.REGENERATOR_THRESHOLD
+    path_records = list(path_records)
+    adjacency, access_nodes, links = topology_from_paths(path_records)
+    access_set = set(access_nodes)
+    baseline = path_analyzer.analyze_all_paths(path_records, threshold)
+    by_link = paths_by_link(path_records)
+
+    tasks = []
+    for link in sorted(links):
+        if not include_access_links and (link[0] in access_set or link[1] in access_set):
+            continue
+        tasks.append((link, links[link], by_link.get(link, [])))
+
+    state = {
+        'adjacency': adjacency,
+        'access_set': access_set,
+        'pairs': [(rec['source'], rec['destination']) for rec in path_records],
+        'baseline': baseline,
+        'network_regenerators': sum(len(r['regenerators']) for r in baseline),
+        'threshold': threshold
+    }
+    if workers is None or workers <= 1:
+        _init_worker(state)
+        return [_worker_evaluate(task) for task in tasks]
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(state,)) as pool:
+        return pool.map(_worker_evaluate, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
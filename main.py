@@ -6,39 +6,547 @@ Example driver script:
   1) parse the input file
   2) run path analyzer
   3) output to CSV
+
+Usage:
+  python main.py plan-shards|run-shard|merge ...   (see cluster_shards.py)
+  python main.py <input_file> [<output_csv>] [--topology [--workers N]] [--shared-sites]
+                 [--format csv|sqlite] [--checkpoint-every N] [--resume]
+                 [--progress-every N] [--metrics-file PATH]
+                 [--shards N [--shard-by source|pair]] [--cache CACHE_DB]
+                 [--engine reference|tree|shm]
+                 [--sample N [--cost-band KM] [--seed S]] [--check-half-hints]
+                 [--top K [--by FIELD]]
+                 [--link-failures [--include-access-links]] [--demand MATRIX]
+                 [--reach-classes TABLE]
+                 [--sort-by FIELD [--descending] [--memory-budget MB]]
+
+  --topology       <input_file> is a topology edge list (topology_paths.py);
+                   the all-pairs paths are computed here instead of by Simon
+  --workers N      processes used for the per-source shortest path runs and
+                   for --engine shm
+  --format sqlite  write the results into a SQLite database (paths table plus
+                   regenerators/opcs child tables, indexed for queries)
+  --checkpoint-every N
+                   record a checkpoint (<output>.ckpt) every N rows while
+                   streaming a Simon file to CSV (default 100000, 0 = off)
+  --progress-every N
+                   every N rows, print bytes read, rows written, parse and
+                   analyze paths/s, the UNREACHABLE count and an ETA to stderr
+                   (progress.py; plain Simon -> CSV runs)
+  --metrics-file PATH
+                   on each progress report, atomically rewrite PATH with the
+                   same numbers in Prometheus text format (for node_exporter's
+                   textfile collector; reports every 100000 rows unless
+                   --progress-every is set)
+  --resume         continue an interrupted run from its last checkpoint,
+                   appending to the existing output
+  --shards N       write N shard CSVs (one writer process each) plus a manifest
+                   with row counts and sha256 checksums (sharded_output.py)
+  --shard-by       partition rows by 'source' node (default) or by 'pair' hash
+  --cache CACHE_DB reuse per-line results stored in CACHE_DB (result_cache.py);
+                   only new or changed lines are parsed and analyzed
+  --engine tree    analyze all paths of a source in one walk over their shared
+                   prefix tree (tree_engine.py); same results, needs all paths
+                   in memory, so it doesn't stream/checkpoint
+  --engine shm     analyze in --workers processes that read the paths from
+                   shared memory instead of receiving pickled copies
+                   (shm_analysis.py); same results as the reference
+  --sample N       fast estimate: analyze only a stratified reservoir sample
+                   of N lines per (source, Cost band) stratum and print the
+                   estimated totals with 95% confidence intervals
+                   (path_sampling.py); no per-path output is written
+  --cost-band KM   width of the Cost bands used by --sample (default 1000)
+  --seed S         random seed for --sample
+  --check-half-hints
+                   validation only: compare each line's Simon "(Half: ... at N)"
+                   node with the OPC analyze_path() places when the path needs
+                   no regenerators, and print how often they disagree
+  --top K          keep only the K highest paths by --by while the results
+                   stream out (result_ranking.py), largest first
+  --by FIELD       residual_distance (default), total_distance, regenerators,
+                   opcs, source or destination
+  --sort-by FIELD  write the CSV sorted by FIELD (same fields as --by); ties
+                   keep input order. Rows beyond --memory-budget MB (default
+                   256) are spilled as sorted runs to $TMPDIR and k-way merged
+                   (external_sort.py)
+  --link-failures  rebuild the network from the paths and, for every single
+                   link failure, reroute the affected pairs and report the
+                   regenerator demand and newly UNREACHABLE pairs per failure
+                   (link_failures.py; failures run in --workers processes)
+  --include-access-links
+                   also fail access links (their access node gets cut off)
+  --demand MATRIX  weight every pair by its lightpath count from a traffic
+                   matrix file ('SRC DST LIGHTPATHS' per line) and write the
+                   demand-weighted regenerator/OPC units per node instead of
+                   the per-path rows (traffic_matrix.py)
+  --reach-classes TABLE
+                   evaluate every path against each transponder class of TABLE
+                   ('NAME REACH_KM TRANSPONDER_COST [REGENERATOR_COST]' per
+                   line), keep the cheapest and write it per path, plus the
+                   network-wide figures per class in <output_stem>_classes.csv
+                   (reach_classes.py)
+  --shared-sites   network-wide mode: pick one shared set of regenerator sites
+                   for all paths (site_consolidation.py) and write the per-path
+                   assignments plus <output_stem>_sites.csv
 """
 
-import sys
+import argparse
+import math
 import os
+import sys
+import time
+
+import checkpoint
+import cluster_shards
+import external_sort
+import result_cache
 
 import input_parser
+import link_failures
 import path_analyzer
+import path_sampling
+import progress
+import reach_classes
 import output_formatter
+import result_ranking
+import sharded_output
+import shm_analysis
+import site_consolidation
+import topology_paths
+import traffic_matrix
+import tree_engine
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Regenerator/OPC placement and residual distance analysis of Simon output paths."
+    )
+    parser.add_argument("input_file", help="Simon output file (or edge list with --topology)")
+    parser.add_argument("output_csv", nargs="?", default="path_analysis_output.csv",
+                        help="output CSV name, written under output/")
+    parser.add_argument("--topology", action="store_true",
+                        help="treat input_file as a topology edge list and compute the paths directly")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for --topology path generation, --engine shm and --link-failures (default: 1)")
+    parser.add_argument("--format", choices=["csv", "sqlite"], default="csv",
+                        help="output backend (default: csv)")
+    parser.add_argument("--shared-sites", action="store_true",
+                        help="consolidate regenerators onto a shared network-wide site set")
+    parser.add_argument("--checkpoint-every", type=int, default=100000, metavar="N",
+                        help="rows between checkpoints when streaming to CSV (0 disables)")
+    parser.add_argument("--resume", action="store_true",
+                        help="resume an interrupted run from its checkpoint")
+    parser.add_argument("--progress-every", type=int, default=0, metavar="N",
+                        help="report progress and throughput to stderr every N rows")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="keep PATH updated with progress metrics in Prometheus text format")
+    parser.add_argument("--shards", type=int, default=None, metavar="N",
+                        help="write N shard files partitioned by --shard-by, plus a manifest")
+    parser.add_argument("--shard-by", choices=sharded_output.SHARD_BY_CHOICES, default="source",
+                        help="shard partitioning key (default: source)")
+    parser.add_argument("--cache", metavar="CACHE_DB",
+                        help="persistent per-line result cache (SQLite file)")
+    parser.add_argument("--engine", choices=["reference", "tree", "shm"], default="reference",
+                        help="analysis engine (default: reference analyze_path)")
+    parser.add_argument("--top", type=int, default=None, metavar="K",
+                        help="write only the K highest paths by --by (bounded heap, O(K) memory)")
+    parser.add_argument("--by", choices=sorted(result_ranking.RANK_FIELDS), default="residual_distance",
+                        help="ranking field for --top (default: residual_distance)")
+    parser.add_argument("--sort-by", choices=sorted(result_ranking.RANK_FIELDS),
+                        help="write the CSV sorted by this field (external merge sort)")
+    parser.add_argument("--descending", action="store_true",
+                        help="sort --sort-by largest first")
+    parser.add_argument("--memory-budget", type=float, default=256, metavar="MB",
+                        help="memory for --sort-by before spilling sorted runs to disk (default: 256)")
+    parser.add_argument("--link-failures", action="store_true",
+                        help="single-link-failure sweep over the network rebuilt from the paths")
+    parser.add_argument("--include-access-links", action="store_true",
+                        help="also fail access links in --link-failures")
+    parser.add_argument("--demand", metavar="MATRIX",
+                        help="weight the results by a traffic matrix file (SRC DST LIGHTPATHS)")
+    parser.add_argument("--sample", type=int, default=0, metavar="N",
+                        help="estimate the totals from a stratified sample of N lines per stratum")
+    parser.add_argument("--cost-band", type=float, default=1000.0, metavar="KM",
+                        help="Cost band width for --sample strata (default: 1000)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="random seed for --sample")
+    parser.add_argument("--check-half-hints", action="store_true",
+                        help="count disagreements between Simon's (Half: ...) nodes and our single OPC")
+    parser.add_argument("--reach-classes", metavar="TABLE",
+                        help="pick the cheapest transponder reach class per path from TABLE")
+    return parser
+
+def run_streaming_csv(input_file, out_path, checkpoint_every, resume, progress_every=0, metrics_file=None):
+    """
+    Parses, analyzes and writes one record at a time, recording a checkpoint
+    every 'checkpoint_every' rows. With resume=True, continues from the last
+    checkpoint so the final file is identical to an uninterrupted run.
+    With progress_every, reports progress every that many rows (progress.py).
+    Returns the network totals.
+    """
+    threshold = path_analyzer.REGENERATOR_THRESHOLD
+    ckpt_path = checkpoint.checkpoint_path_for(out_path)
+
+    state = checkpoint.load_checkpoint(ckpt_path) if resume else None
+    if resume and state is None:
+        print(f"No checkpoint at {ckpt_path}, starting from the beginning.")
+    if state is not None:
+        problem = checkpoint.check_resumable(state, input_file, threshold)
+        if problem:
+            print(f"Cannot resume: {problem}")
+            sys.exit(1)
+        print(f"Resuming at row {state['rows_written']} (input byte {state['input_offset']}).")
+    else:
+        state = {
+            'input_file': os.path.abspath(input_file),
+            'input_size': os.path.getsize(input_file),
+            'threshold': threshold,
+            'input_offset': 0,
+            'rows_written': 0,
+            'output_bytes': 0,
+            'totals': path_analyzer.empty_totals()
+        }
+
+    totals = state['totals']
+    rows_written = state['rows_written']
+
+    if state['output_bytes'] > 0:
+        # drop anything written after the checkpoint, then append
+        csvfile = open(out_path, 'r+', newline='', encoding='utf-8')
+        csvfile.truncate(state['output_bytes'])
+        csvfile.seek(state['output_bytes'])
+        writer = output_formatter.open_csv_writer(csvfile, write_header=False)
+    else:
+        csvfile = open(out_path, 'w', newline='', encoding='utf-8')
+        writer = output_formatter.open_csv_writer(csvfile)
+
+    def take_checkpoint(offset):
+        csvfile.flush()
+        os.fsync(csvfile.fileno())
+        state['input_offset'] = offset
+        state['rows_written'] = rows_written
+        state['output_bytes'] = csvfile.tell()
+        checkpoint.save_checkpoint(ckpt_path, state)
+
+    reporter = None
+    sample_every = 0
+    if progress_every or metrics_file:
+        reporter = progress.ProgressReporter(state['input_size'], progress_every or 100000, metrics_file,
+                                             start_offset=state['input_offset'], start_rows=rows_written,
+                                             label=os.path.basename(input_file))
+        sample_every = math.gcd(progress.SAMPLE_EVERY, reporter.every)  # divides every, so reports land on time
+        next_report = rows_written + reporter.every
+    perf_counter = time.perf_counter
+    offset = state['input_offset']
+
+    with csvfile:
+        # without a reporter the loop only pays for two falsy checks; with one,
+        # the clock is read for one record in every sample_every
+        t_parse = None
+        for rec, offset in input_parser.iter_simon_output_file(input_file, state['input_offset']):
+            if t_parse is not None:
+                t_analyze = perf_counter()
+                result = path_analyzer.analyze_path(rec, threshold)
+                reporter.add_timing(t_analyze - t_parse, perf_counter() - t_analyze)
+                t_parse = None
+            else:
+                result = path_analyzer.analyze_path(rec, threshold)
+            writer.writerow(output_formatter.format_csv_row(result))
+            path_analyzer.add_to_totals(totals, result)
+            rows_written += 1
+            if checkpoint_every and rows_written % checkpoint_every == 0:
+                take_checkpoint(offset)
+            if sample_every and rows_written % sample_every == 0:
+                if rows_written >= next_report:
+                    reporter.report_at(offset, totals)
+                    next_report += reporter.every
+                t_parse = perf_counter()  # time the next record's parse and analysis
+
+    checkpoint.remove_checkpoint(ckpt_path)
+    if reporter is not None:
+        reporter.report_at(offset, totals, done=True)
+    return totals
+
+# Options that pick what the run does, in the order main() checks them. Each
+# one returns before the next is looked at, so at most one may be given.
+MODE_OPTIONS = (
+    ('sample', '--sample'),
+    ('check_half_hints', '--check-half-hints'),
+    ('top', '--top'),
+    ('sort_by', '--sort-by'),
+    ('demand', '--demand'),
+    ('reach_classes', '--reach-classes'),
+    ('shards', '--shards'),
+    ('link_failures', '--link-failures'),
+    ('shared_sites', '--shared-sites'),
+)
+
+# option -> what reads it: mode options, or '--topology' / '--engine shm'
+MODE_SUBOPTIONS = (
+    ('by', '--by', ('--top',)),
+    ('descending', '--descending', ('--sort-by',)),
+    ('memory_budget', '--memory-budget', ('--sort-by',)),
+    ('shard_by', '--shard-by', ('--shards',)),
+    ('cost_band', '--cost-band', ('--sample',)),
+    ('seed', '--seed', ('--sample',)),
+    ('include_access_links', '--include-access-links', ('--link-failures',)),
+    ('workers', '--workers', ('--topology', '--engine shm', '--link-failures')),
+)
+
+# modes that go through iter_results() or the in-memory run, and so honor --engine
+ENGINE_MODES = (None, '--top', '--sort-by', '--demand', '--shards')
+
+# modes that can write --format sqlite
+SQLITE_MODES = (None, '--top')
+
+# options only the plain streaming Simon -> CSV run reads
+STREAMING_OPTIONS = (
+    ('checkpoint_every', '--checkpoint-every'),
+    ('resume', '--resume'),
+    ('progress_every', '--progress-every'),
+    ('metrics_file', '--metrics-file'),
+)
+
+def validate_args(parser, args):
+    """
+    Rejects option values argparse's types can't catch, and combinations of
+    options where one would be silently ignored, with a usage error
+    (parser.error exits with status 2) instead of a traceback or a run that
+    doesn't do what was asked.
+    """
+    if args.sample and args.sample < 2:
+        parser.error("--sample N needs N >= 2 (the confidence intervals need a variance)")
+    if args.cost_band <= 0:
+        parser.error("--cost-band must be > 0")
+    if args.top is not None and args.top < 1:
+        parser.error("--top K needs K >= 1")
+    if args.shards is not None and args.shards < 1:
+        parser.error("--shards N needs N >= 1")
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    if args.memory_budget <= 0:
+        parser.error("--memory-budget must be > 0")
+    if args.progress_every < 0:
+        parser.error("--progress-every must be >= 0")
+    if args.checkpoint_every < 0:
+        parser.error("--checkpoint-every must be >= 0 (0 disables checkpoints)")
+
+    def given(dest):
+        return getattr(args, dest) != parser.get_default(dest)
+
+    modes = [flag for dest, flag in MODE_OPTIONS if getattr(args, dest)]
+    if len(modes) > 1:
+        parser.error(f"{modes[0]} and {modes[1]} can't be combined; each selects its own kind of run")
+    mode = modes[0] if modes else None
+
+    active = {mode}
+    if args.topology:
+        active.add('--topology')
+    if args.engine == 'shm':
+        active.add('--engine shm')
+    for dest, flag, owners in MODE_SUBOPTIONS:
+        if given(dest) and active.isdisjoint(owners):
+            parser.error(f"{flag} only applies with {' or '.join(owners)}")
+
+    if args.topology and mode in ('--sample', '--check-half-hints'):
+        parser.error(f"{mode} works on Simon output files, not --topology edge lists")
+    if args.engine != 'reference' and mode not in ENGINE_MODES:
+        parser.error(f"--engine {args.engine} doesn't apply to {mode}, which always uses the reference analyzer")
+    if args.format == 'sqlite' and mode not in SQLITE_MODES:
+        parser.error(f"--format sqlite isn't supported with {mode}")
+
+    # the plain Simon -> CSV run main() streams (and can serve from --cache)
+    streaming = (mode is None and not args.topology
+                 and args.format == 'csv' and args.engine == 'reference')
+    if args.cache and not streaming:
+        parser.error("--cache only applies to the plain Simon -> CSV run "
+                     "(no mode option, no --topology, --format csv, --engine reference)")
+    for dest, flag in STREAMING_OPTIONS:
+        if given(dest) and (not streaming or args.cache):
+            parser.error(f"{flag} only applies to the plain streaming Simon -> CSV run "
+                         "(no mode option, no --topology or --cache, --format csv, --engine reference)")
+
+def iter_results(args):
+    """
+    Streams the analysis results of the input (Simon file or --topology edge
+    list) in input order. With the reference engine nothing is held beyond the
+    record in hand (and the few --topology sources computed ahead); the tree
+    and shm engines need all paths in memory first.
+    """
+    if args.topology:
+        path_records = topology_paths.stream_path_records(args.input_file, workers=args.workers)
+    else:
+        path_records = (rec for rec, _ in input_parser.iter_simon_output_file(args.input_file))
+    if args.engine == "tree":
+        return iter(tree_engine.analyze_all_paths_tree(list(path_records)))
+    if args.engine == "shm":
+        return iter(shm_analysis.analyze_all_paths_shared(path_records, workers=args.workers))
+    return (path_analyzer.analyze_path(rec) for rec in path_records)
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <input_file> [<output_csv>]")
-        sys.exit(1)
+    if len(sys.argv) > 1 and sys.argv[1] in cluster_shards.COMMANDS:
+        cluster_shards.main(sys.argv[1:])
+        return
 
-    input_file = sys.argv[1]
-    output_csv = sys.argv[2] if len(sys.argv) > 2 else "path_analysis_output.csv"
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    validate_args(parser, args)
 
-    # 1) parse
-    path_records = input_parser.parse_simon_output_file(input_file)
+    input_file = args.input_file
+    output_csv = args.output_csv
+    if args.format == "sqlite" and output_csv == "path_analysis_output.csv":
+        output_csv = "path_analysis_output.db"
 
-    # 2) analyze
-    # Optionally adjust threshold:
-    # path_analyzer.REGENERATOR_THRESHOLD = 1500.0
-    results = path_analyzer.analyze_all_paths(path_records)
+    if args.sample:
+        strata = path_sampling.reservoir_sample_file(input_file, args.sample, args.cost_band, args.seed)
+        report = path_sampling.estimate_totals(strata)
+        print(path_sampling.format_estimates(report))
+        return
+
+    if args.check_half_hints:
+        records = (rec for rec, _ in input_parser.iter_simon_output_file(input_file))
+        report = path_analyzer.check_half_hints(records)
+        print(f"{report['paths']} paths, {report['with_hint']} with a (Half: ...) hint; "
+              f"{report['checked']} need a single OPC: {report['agree']} agree, "
+              f"{report['disagree']} disagree.")
+        for source, destination, hint, ours in report['examples']:
+            print(f"  {source}->{destination}: Simon's half-way node {hint}, our OPC {ours}")
+        return
 
-    # 3) write CSV
     out_dir = "output"
     if not os.path.exists(out_dir):
         os.makedirs(out_dir)
-
     out_path = os.path.join(out_dir, output_csv)
-    output_formatter.write_analysis_to_csv(results, out_path)
+
+    if args.top:
+        # only the K highest rows are ever held in memory
+        top = result_ranking.top_k(iter_results(args), args.top, args.by)
+        if args.format == "sqlite":
+            output_formatter.write_analysis_to_sqlite(top, out_path)
+        else:
+            output_formatter.write_analysis_to_csv(top, out_path)
+        print(f"Top {len(top)} paths by {args.by} in {out_path}")
+        return
+
+    if args.sort_by:
+        stats = external_sort.external_sort_to_csv(
+            iter_results(args), out_path, args.sort_by, args.descending,
+            memory_budget_bytes=int(args.memory_budget * 1024 * 1024)
+        )
+        print(f"Analysis complete. {stats['rows']} rows sorted by {args.sort_by} "
+              f"({stats['runs']} sorted runs). Results in {out_path}")
+        return
+
+    if args.demand:
+        matrix = traffic_matrix.load_traffic_matrix(args.demand)
+        totals, regen_units, opc_units = traffic_matrix.weighted_totals(iter_results(args), matrix)
+        output_formatter.write_node_units_to_csv(regen_units, opc_units, out_path)
+        print(f"Demand-weighted: {traffic_matrix.format_weighted_totals(totals)}. "
+              f"Per-node units in {out_path}")
+        return
+
+    if args.reach_classes:
+        classes = reach_classes.load_reach_classes(args.reach_classes)
+        if args.topology:
+            path_records = topology_paths.stream_path_records(input_file, workers=args.workers)
+        else:
+            path_records = (rec for rec, _ in input_parser.iter_simon_output_file(input_file))
+        summary = reach_classes.empty_class_summary(classes)
+        with open(out_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = output_formatter.open_reach_class_writer(csvfile)
+            for result, reach_class, cost in reach_classes.iter_reach_class_rows(path_records, classes, summary):
+                writer.writerow(output_formatter.format_reach_class_row(result, reach_class, cost))
+        stem, ext = os.path.splitext(out_path)
+        classes_path = f"{stem}_classes{ext or '.csv'}"
+        output_formatter.write_class_summary_to_csv(summary, classes_path)
+        print(f"Reach classes: {reach_classes.format_class_summary(summary)}. "
+              f"Results in {out_path}, per-class figures in {classes_path}")
+        return
+
+    if args.shards:
+        # stream the results straight into the shard writer processes
+        results = iter_results(args)
+        manifest = sharded_output.write_analysis_to_shards(results, out_path, args.shards, args.shard_by)
+        _, manifest_path = sharded_output.shard_file_names(out_path, args.shards)
+        print(f"Analysis complete. {manifest['total_rows']} rows in {args.shards} shards "
+              f"(by {args.shard_by}). Manifest in {manifest_path}")
+        return
+
+    streamable = (not args.topology and not args.shared_sites and not args.link_failures
+                  and args.format == "csv" and args.engine == "reference")
+
+    if args.cache and streamable:
+        # rerun: results for unchanged lines come straight from the cache
+        stats = {}
+        totals = path_analyzer.empty_totals()
+        with result_cache.ResultCache(args.cache) as cache, \
+                open(out_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = output_formatter.open_csv_writer(csvfile)
+            for result in result_cache.iter_analyze_file_cached(input_file, cache, stats=stats):
+                writer.writerow(output_formatter.format_csv_row(result))
+                path_analyzer.add_to_totals(totals, result)
+        print(f"Analysis complete. {path_analyzer.format_totals(totals)}. "
+              f"Cache: {stats['hits']} hits, {stats['misses']} lines analyzed. Results in {out_path}")
+        return
+
+    if streamable:
+        # plain Simon -> CSV run: stream it, with checkpoints
+        totals = run_streaming_csv(input_file, out_path, args.checkpoint_every, args.resume,
+                                   args.progress_every, args.metrics_file)
+        print(f"Analysis complete. {path_analyzer.format_totals(totals)}. Results in {out_path}")
+        return
+
+    # 1) parse (or generate the paths from the topology)
+    if args.topology:
+        path_records = topology_paths.generate_path_records(input_file, workers=args.workers)
+    else:
+        parse_stats = {}
+        path_records = input_parser.parse_simon_output_file(input_file, stats=parse_stats)
+        print(f"Parsed {parse_stats['paths']} paths; {parse_stats['shared_pairs']} read the stored "
+              f"route of their reverse direction instead of a copy.")
+
+    if args.link_failures:
+        reports = link_failures.sweep_link_failures(path_records, workers=args.workers,
+                                                    include_access_links=args.include_access_links)
+        output_formatter.write_failure_report_to_csv(reports, out_path)
+        cut = sum(1 for r in reports if r['newly_unreachable'])
+        worst = max(reports, key=lambda r: (r['newly_unreachable'], r['regenerator_delta']), default=None)
+        print(f"Link failure sweep: {len(reports)} links, {cut} of them leave pairs newly unreachable.")
+        if worst is not None:
+            print(f"Worst: {worst['link_a']}-{worst['link_b']} ({worst['newly_unreachable']} newly unreachable, "
+                  f"{worst['regenerator_delta']:+d} regenerators). Report in {out_path}")
+        return
+
+    if args.shared_sites:
+        # 2) network-wide site selection instead of per-path placement
+        assignments, sites = site_consolidation.consolidate_regenerator_sites(path_records)
+        per_path_sites = set()
+        for p in path_records:
+            per_path_sites.update(path_analyzer.analyze_path(p)['regenerators'])
+
+        stem, ext = os.path.splitext(out_path)
+        sites_path = f"{stem}_sites{ext or '.csv'}"
+        output_formatter.write_site_plan_to_csv(assignments, sites, out_path, sites_path)
+        print(f"Shared-site plan: {len(sites)} regenerator sites "
+              f"(per-path placement uses {len(per_path_sites)}). "
+              f"Assignments in {out_path}, sites in {sites_path}")
+        return
+
+    # 2) analyze
+    # Optionally adjust threshold:
+    # path_analyzer.REGENERATOR_THRESHOLD = 1500.0
+    if args.engine == "tree":
+        results = tree_engine.analyze_all_paths_tree(path_records)
+    elif args.engine == "shm":
+        results = shm_analysis.analyze_all_paths_shared(path_records, workers=args.workers)
+    else:
+        results = path_analyzer.analyze_all_paths(path_records)
+
+    # 3) write CSV (or SQLite)
+    if args.format == "sqlite":
+        output_formatter.write_analysis_to_sqlite(results, out_path)
+    else:
+        output_formatter.write_analysis_to_csv(results, out_path)
     print(f"Analysis complete. Results in {out_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -6,6 +6,42 @@ Takes the final results from path_analyzer and writes them to CSV.
 """
 
 import csv
+import os
+import sqlite3
+
+CSV_FIELDNAMES = [
+    'source',
+    'destination',
+    'total_distance',
+    'regenerators',
+    'opcs',
+    'residual_distance',
+    'status'
+]
+
+def format_csv_row(row):
+    """
+    Converts one analysis result into the dict written as a CSV row.
+    """
+    return {
+        'source': row['source'],
+        'destination': row['destination'],
+        'total_distance': row['total_distance'],
+        'regenerators': ";".join(map(str, row['regenerators'])),
+        'opcs': ";".join(map(str, row['opcs'])),
+        'residual_distance': row['residual_distance'],
+        'status': row['status']
+    }
+
+def open_csv_writer(csvfile, write_header=True):
+    """
+    Wraps an already open text file (opened with newline='') in a DictWriter
+    for analysis rows, for callers that stream results instead of passing a list.
+    """
+    writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+    if write_header:
+        writer.writeheader()
+    return writer
 
 def write_analysis_to_csv(results_list, output_csv_path):
     """
@@ -20,26 +56,212 @@ def write_analysis_to_csv(results_list, output_csv_path):
         'status': str
       }
     """
+    with open(output_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = open_csv_writer(csvfile)
+        for row in results_list:
+            writer.writerow(format_csv_row(row))
+
+
+def write_site_plan_to_csv(assignments, sites, assignments_csv_path, sites_csv_path):
+    """
+    Writes the network-wide regenerator plan from site_consolidation:
+      - assignments: one row per path with the shared sites it uses
+      - sites: one row per regenerator site with the number of paths it serves
+    """
     fieldnames = [
         'source',
         'destination',
         'total_distance',
         'regenerators',
-        'opcs',
-        'residual_distance',
         'status'
     ]
-    with open(output_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+    with open(assignments_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
-        for row in results_list:
-            outrow = {
+        for row in assignments:
+            writer.writerow({
                 'source': row['source'],
                 'destination': row['destination'],
                 'total_distance': row['total_distance'],
                 'regenerators': ";".join(map(str, row['regenerators'])),
-                'opcs': ";".join(map(str, row['opcs'])),
-                'residual_distance': row['residual_distance'],
                 'status': row['status']
-            }
-            writer.writerow(outrow)
\ No newline at end of file
+            })
+
+    with open(sites_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['site', 'paths_served'])
+        for site, paths_served in sites:
+            writer.writerow([site, paths_served])
+
+FAILURE_FIELDNAMES = [
+    'link_a',
+    'link_b',
+    'km',
+    'affected_pairs',
+    'disconnected_pairs',
+    'newly_unreachable',
+    'regenerators_before',
+    'regenerators_after',
+    'regenerator_delta',
+    'network_regenerators'
+]
+
+def write_failure_report_to_csv(reports, output_csv_path):
+    """
+    Writes the per-failure rows of link_failures.sweep_link_failures().
+    """
+    with open(output_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FAILURE_FIELDNAMES)
+        writer.writeheader()
+        for row in reports:
+            writer.writerow(row)
+
+def write_node_units_to_csv(regenerator_units, opc_units, output_csv_path):
+    """
+    Writes the demand-weighted per-node units of traffic_matrix.weighted_totals(),
+    one row per node that has any (arrays are indexed by node ID).
+    """
+    with open(output_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['node', 'regenerator_units', 'opc_units'])
+        for node in range(max(len(regenerator_units), len(opc_units))):
+            regens = regenerator_units[node] if node < len(regenerator_units) else 0.0
+            opcs = opc_units[node] if node < len(opc_units) else 0.0
+            if regens or opcs:
+                writer.writerow([node, f"{regens:g}", f"{opcs:g}"])
+
+REACH_CLASS_FIELDNAMES = CSV_FIELDNAMES + ['reach_class', 'path_cost']
+
+def open_reach_class_writer(csvfile):
+    """
+    DictWriter for the rows of reach_classes.iter_reach_class_rows(): the
+    usual analysis columns plus the chosen class and the path's cost.
+    """
+    writer = csv.DictWriter(csvfile, fieldnames=REACH_CLASS_FIELDNAMES)
+    writer.writeheader()
+    return writer
+
+def format_reach_class_row(result, reach_class, path_cost):
+    row = format_csv_row(result)
+    row['reach_class'] = reach_class
+    row['path_cost'] = path_cost
+    return row
+
+def write_class_summary_to_csv(summary, output_csv_path):
+    """
+    Writes the per-class network figures of reach_classes.empty_class_summary().
+    """
+    with open(output_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['reach_class', 'reach_km', 'transponder_cost', 'regenerator_cost',
+                         'chosen_paths', 'chosen_regenerators', 'chosen_cost',
+                         'alone_unreachable', 'alone_regenerators', 'alone_cost'])
+        for c in summary['classes']:
+            writer.writerow([c['name'], c['reach_km'], c['transponder_cost'], c['regenerator_cost'],
+                             c['chosen_paths'], c['chosen_regenerators'], round(c['chosen_cost'], 2),
+                             c['alone_unreachable'], c['alone_regenerators'], round(c['alone_cost'], 2)])
+
+SQLITE_SCHEMA = """
+CREATE TABLE paths (
+    id                INTEGER PRIMARY KEY,
+    source            INTEGER NOT NULL,
+    destination       INTEGER NOT NULL,
+    total_distance    REAL    NOT NULL,
+    residual_distance REAL    NOT NULL,
+    status            TEXT    NOT NULL,
+    regenerator_count INTEGER NOT NULL,
+    opc_count         INTEGER NOT NULL
+);
+CREATE TABLE regenerators (
+    path_id  INTEGER NOT NULL REFERENCES paths(id),
+    position INTEGER NOT NULL,
+    node     INTEGER NOT NULL
+);
+CREATE TABLE opcs (
+    path_id  INTEGER NOT NULL REFERENCES paths(id),
+    position INTEGER NOT NULL,
+    node     INTEGER NOT NULL
+);
+"""
+
+# Indexes are built once after the bulk load; maintaining them row by row
+# during the inserts would dominate the load time.
+SQLITE_INDEXES = """
+CREATE INDEX idx_paths_source       ON paths(source);
+CREATE INDEX idx_paths_destination  ON paths(destination);
+CREATE INDEX idx_paths_status       ON paths(status);
+CREATE INDEX idx_regenerators_node  ON regenerators(node);
+CREATE INDEX idx_regenerators_path  ON regenerators(path_id);
+CREATE INDEX idx_opcs_node          ON opcs(node);
+CREATE INDEX idx_opcs_path          ON opcs(path_id);
+"""
+
+def write_analysis_to_sqlite(results_list, output_db_path, batch_size=50000):
+    """
+    Writes the same results as write_analysis_to_csv() into a SQLite database:
+      paths        one row per result (id = 1-based position in results_list)
+      regenerators (path_id, position, node) per placed regenerator
+      opcs         (path_id, position, node) per placed OPC
+    with indexes on source, destination, status and the site node columns.
+
+    An existing file at output_db_path is replaced, like the CSV writer does.
+    Rows go in with executemany() in batches inside a single transaction.
+
+    Example queries:
+      -- all paths with a regenerator at node 33
+      SELECT p.* FROM paths p JOIN regenerators r ON r.path_id = p.id WHERE r.node = 33;
+      -- worst residual per source
+      SELECT source, MAX(residual_distance) FROM paths GROUP BY source;
+    """
+    if os.path.exists(output_db_path):
+        os.remove(output_db_path)
+
+    # autocommit mode; the transaction is managed explicitly below
+    conn = sqlite3.connect(output_db_path, isolation_level=None)
+    try:
+        # bulk-load settings: the file is rebuilt from scratch on failure anyway
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SQLITE_SCHEMA)
+
+        insert_path = "INSERT INTO paths VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        insert_regen = "INSERT INTO regenerators VALUES (?, ?, ?)"
+        insert_opc = "INSERT INTO opcs VALUES (?, ?, ?)"
+
+        path_rows = []
+        regen_rows = []
+        opc_rows = []
+
+        def flush():
+            conn.executemany(insert_path, path_rows)
+            conn.executemany(insert_regen, regen_rows)
+            conn.executemany(insert_opc, opc_rows)
+            path_rows.clear()
+            regen_rows.clear()
+            opc_rows.clear()
+
+        conn.execute("BEGIN")
+        for path_id, row in enumerate(results_list, 1):
+            regens = row['regenerators']
+            opcs = row['opcs']
+            path_rows.append((
+                path_id,
+                row['source'],
+                row['destination'],
+                row['total_distance'],
+                row['residual_distance'],
+                row['status'],
+                len(regens),
+                len(opcs)
+            ))
+            for pos, nd in enumerate(regens):
+                regen_rows.append((path_id, pos, nd))
+            for pos, nd in enumerate(opcs):
+                opc_rows.append((path_id, pos, nd))
+            if len(path_rows) >= batch_size:
+                flush()
+        flush()
+        conn.execute("COMMIT")
+        conn.executescript(SQLITE_INDEXES)
+    finally:
+        conn.close()
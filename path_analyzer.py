@@ -1,55 +1,31 @@
 #!/usr/bin/env python3
 
-REGENERATOR_THRESHOLD = 2000.0
+from itertools import accumulate, chain
 
-def analyze_path(path_record):
-    """
-    Analyze a single path, ignoring the true source (index=0 in nodeIDs)
-    and the true destination (index=n-1 in nodeIDs).
-    We only consider [1..n-2], i.e. from source ROADM to destination ROADM.
+from records import AnalysisResult, path_arrays
 
-    Then apply:
-      - Regenerator logic
-      - OPC logic
-      - Residual distance logic
-    Returns an analysis dict.
-    """
+REGENERATOR_THRESHOLD = 2000.0
 
-    source = path_record['source']
-    destination = path_record['destination']
-    node_pairs = path_record['nodes']  # [(nodeID, distToNext), ... , (finalNode,0.0)]
-    full_n = len(node_pairs)
-    full_nodeIDs = [x[0] for x in node_pairs]
-    full_distances = [x[1] for x in node_pairs]
-    total_dist_full = sum(full_distances)
+# Bump whenever the placement/residual rules below change, so persisted
+# results (result_cache.py) computed by an older version are not reused.
+ANALYZER_VERSION = "1"
 
-    # If the path has fewer than 3 nodes total, there's no ROADM in between, trivial path
-    # But the user specifically wants to skip the first and last node => sub array is [1..(full_n-2)].
-    if full_n < 3:
-        # There's no real analysis possible
-        return {
-            'source': source,
-            'destination': destination,
-            'total_distance': 0.0,
-            'regenerators': [],
-            'opcs': [],
-            'residual_distance': 0.0,
-            'status': 'UNREACHABLE'
-        }
+def build_sub_array(full_nodeIDs, full_distances):
+    """
+    Build the "analysis sub-array" => nodeIDs[1..n-2]
+    ignoring the link from 0->1 and the link from n-2->n-1
+    so sub_array length = (full_n - 2).
 
-    # ----------------------------------------------------------------------
-    # 1) Build the "analysis sub-array" => nodeIDs[1..n-2]
-    #    ignoring the link from 0->1 and the link from n-2->n-1
-    #    so sub_array length = (full_n - 2)
-    # ----------------------------------------------------------------------
+    Returns (sub_nodes, sub_distances) where sub_distances[i] is the distance
+    from sub_nodes[i] -> sub_nodes[i+1], for i in [0..(sub_n-2)].
+    """
+    full_n = len(full_nodeIDs)
     sub_nodes = full_nodeIDs[1:(full_n - 1)]  # nodeIDs[1..(n-2)]
     sub_n = len(sub_nodes)
     # e.g. if full_n=9, sub_n=7 => indices in sub_nodes => 0..6
     # sub_nodes[0] => was full_nodeIDs[1], the "source ROADM"
     # sub_nodes[sub_n-1] => was full_nodeIDs[n-2], the "destination ROADM"
 
-    # Next, build "sub_distances" so that sub_distances[i] is the distance from
-    # sub_nodes[i] -> sub_nodes[i+1], for i in [0..(sub_n-2)].
     sub_distances = []
     for i in range(sub_n - 1):
         # sub_nodes[i] is full_nodeIDs[i+1] in the original
@@ -70,6 +46,134 @@ def analyze_path(path_record):
                 break
         sub_distances.append(dist_ij)
 
+    return sub_nodes, sub_distances
+
+def _analyze_with_half_hint(source, destination, full_nodeIDs, full_distances, hint, threshold):
+    """
+    Case 1 (no regenerators, one OPC over the whole sub-array) taken straight
+    from Simon's half-way node at full index 'hint'. Returns the same
+    AnalysisResult analyze_path() would, or None if the path isn't case 1 or
+    the hint isn't the node the midpoint scan picks.
+
+    With distinct node IDs, build_sub_array() just returns a slice, so the
+    O(n^2) build is skipped. The partial sums come from accumulate() (same +=
+    order as the loop in analyze_path()). Hop distances are never negative
+    here, so |partial - midpoint| falls until the midpoint and then rises.
+    The hint k is the scan's first minimum iff its left neighbour is strictly
+    worse and its right neighbour is strictly worse, or equal but already
+    past the midpoint (an equal one before it could be a plateau).
+    """
+    full_n = len(full_nodeIDs)
+    sub_n = full_n - 2
+    k = hint - 1  # full -> sub-array index
+    if not 1 <= k <= sub_n - 2:
+        return None
+    if len(set(full_nodeIDs)) != full_n:
+        # repeated nodes: build_sub_array() may take another hop's distance
+        return None
+    sub_distances = full_distances[1:full_n - 2]
+    if min(sub_distances) < 0:
+        return None
+    total_sub_distance = sum(sub_distances)
+    if total_sub_distance > threshold:
+        return None
+
+    partial = list(accumulate(chain((0.0,), sub_distances)))
+    sec_dist = abs(partial[sub_n-1] - partial[0])
+    if sec_dist <= 0:
+        return None
+    midpoint = partial[0] + sec_dist/2.0
+    diff = abs(partial[k] - midpoint)
+    if k > 1 and not abs(partial[k-1] - midpoint) > diff:
+        return None
+    if k < sub_n-2:
+        right = partial[k+1]
+        right_diff = abs(right - midpoint)
+        if right_diff < diff or (right_diff == diff and right < midpoint):
+            return None
+
+    # residual as analyze_path() sums it: one section, no leftover
+    leftd = abs(partial[k] - partial[0])
+    rightd = abs(partial[sub_n-1] - partial[k])
+    residual = 0.0 + abs(leftd - rightd)
+    return AnalysisResult(
+        source=source,
+        destination=destination,
+        total_distance=round(total_sub_distance,2),
+        regenerators=[],
+        opcs=[full_nodeIDs[hint]],
+        residual_distance=round(residual,2),
+        status='OK'
+    )
+
+def analyze_path(path_record, threshold=None, use_half_hint=True):
+    """
+    Analyze a single path, ignoring the true source (index=0 in nodeIDs)
+    and the true destination (index=n-1 in nodeIDs).
+    We only consider [1..n-2], i.e. from source ROADM to destination ROADM.
+
+    Then apply:
+      - Regenerator logic
+      - OPC logic
+      - Residual distance logic
+    Returns an AnalysisResult (readable like the old analysis dict).
+    path_record may be a PathRecord or an old-style path dict.
+
+    threshold defaults to the module-level REGENERATOR_THRESHOLD (read at call
+    time, so overriding path_analyzer.REGENERATOR_THRESHOLD still works).
+
+    If the record carries Simon's "(Half: ... at N)" node (half_index) and
+    use_half_hint is set, a case-1 path is answered by
+    _analyze_with_half_hint() without building the sub-array or scanning for
+    the midpoint; the result is the same either way.
+    """
+    if threshold is None:
+        threshold = REGENERATOR_THRESHOLD
+
+    source = path_record['source']
+    destination = path_record['destination']
+    node_ids, distances = path_arrays(path_record)  # nodeIDs and distToNext, final node has 0.0
+    full_n = len(node_ids)
+    full_nodeIDs = list(node_ids)
+    full_distances = list(distances)
+    total_dist_full = sum(full_distances)
+
+    # If the path has fewer than 3 nodes total, there's no ROADM in between, trivial path
+    # But the user specifically wants to skip the first and last node => sub array is [1..(full_n-2)].
+    if full_n < 3:
+        # There's no real analysis possible
+        return AnalysisResult(
+            source=source,
+            destination=destination,
+            total_distance=0.0,
+            regenerators=[],
+            opcs=[],
+            residual_distance=0.0,
+            status='UNREACHABLE'
+        )
+
+    if use_half_hint:
+        hint = getattr(path_record, 'half_index', -1)
+        if hint > 0:
+            result = _analyze_with_half_hint(source, destination, full_nodeIDs, full_distances,
+                                             hint, threshold)
+            if result is not None:
+                return result
+
+    # ----------------------------------------------------------------------
+    # 1) Build the "analysis sub-array" => nodeIDs[1..n-2]
+    # ----------------------------------------------------------------------
+    sub_nodes, sub_distances = build_sub_array(full_nodeIDs, full_distances)
+    return analyze_sub_array(source, destination, sub_nodes, sub_distances, threshold)
+
+def analyze_sub_array(source, destination, sub_nodes, sub_distances, threshold):
+    """
+    Steps 2-4 of analyze_path() on an already built sub-array (sub_nodes has
+    at least one node; see build_sub_array()), for callers that need the
+    sub-array themselves and shouldn't pay for building it twice.
+    """
+    sub_n = len(sub_nodes)
+
     total_sub_distance = sum(sub_distances)
 
     # We'll now do all threshold-based logic on sub_nodes (length sub_n) & sub_distances.
@@ -87,7 +191,7 @@ def analyze_path(path_record):
     # ----------------------------------------------------------------------
     unreachable = False
     regens = []  # list of nodeIDs in sub-array
-    if total_sub_distance <= REGENERATOR_THRESHOLD:
+    if total_sub_distance <= threshold:
         # no regens needed
         pass
     else:
@@ -95,27 +199,27 @@ def analyze_path(path_record):
         for i in range(1, sub_n):
             dist_incr = sub_distances[i-1]  # distance sub_nodes[i-1] -> sub_nodes[i]
             local_dist += dist_incr
-            if local_dist > REGENERATOR_THRESHOLD:
+            if local_dist > threshold:
                 # place a reg at i-1 if valid
                 if not is_valid_sub_index(i-1):
                     unreachable = True
                     break
                 regens.append(sub_nodes[i-1])
                 local_dist = dist_incr
-                if local_dist > REGENERATOR_THRESHOLD:
+                if local_dist > threshold:
                     unreachable = True
                     break
 
     if unreachable:
-        return {
-            'source': source,
-            'destination': destination,
-            'total_distance': round(total_sub_distance,2),
-            'regenerators': [],
-            'opcs': [],
-            'residual_distance': 0.0,
-            'status': 'UNREACHABLE'
-        }
+        return AnalysisResult(
+            source=source,
+            destination=destination,
+            total_distance=round(total_sub_distance,2),
+            regenerators=[],
+            opcs=[],
+            residual_distance=0.0,
+            status='UNREACHABLE'
+        )
 
     # ----------------------------------------------------------------------
     # 3) OPC Placement
@@ -162,7 +266,7 @@ def analyze_path(path_record):
     opcs = []
     if len(regens) == 0:
         # case1: no reg
-        if total_sub_distance <= REGENERATOR_THRESHOLD:
+        if total_sub_distance <= threshold:
             # if sub_n >= 3 => place 1 OPC
             if sub_n >= 3:
                 candidate = place_one_opc_in_subsection(0, sub_n-1)
@@ -251,18 +355,80 @@ def analyze_path(path_record):
 
         residual = sum_abs_diff + leftover
 
-    return {
-        'source': source,
-        'destination': destination,
-        'total_distance': round(total_sub_distance,2),
-        'regenerators': regens,
-        'opcs': opcs,
-        'residual_distance': round(residual,2),
-        'status': 'OK'
-    }
+    return AnalysisResult(
+        source=source,
+        destination=destination,
+        total_distance=round(total_sub_distance,2),
+        regenerators=regens,
+        opcs=opcs,
+        residual_distance=round(residual,2),
+        status='OK'
+    )
 
-def analyze_all_paths(path_records):
+def analyze_all_paths(path_records, threshold=None):
     results = []
     for p in path_records:
-        results.append(analyze_path(p))
-    return results
\ No newline at end of file
+        results.append(analyze_path(p, threshold))
+    return results
+
+def check_half_hints(path_records, threshold=None, max_examples=10):
+    """
+    Validation mode for Simon's "(Half: ... at N)" hints: analyzes every path
+    without the hint and compares N with the OPC we place in case 1 (no
+    regenerators, one OPC over the whole sub-array). Returns
+      { 'paths', 'with_hint', 'checked', 'agree', 'disagree', 'examples' }
+    where 'checked' counts the case-1 paths with a hint, and 'examples' holds
+    up to max_examples (source, destination, hint node, our OPC or None).
+    """
+    report = {'paths': 0, 'with_hint': 0, 'checked': 0, 'agree': 0, 'disagree': 0, 'examples': []}
+    for rec in path_records:
+        report['paths'] += 1
+        half_index = getattr(rec, 'half_index', -1)
+        if half_index < 0:
+            continue
+        report['with_hint'] += 1
+        node_ids, _ = path_arrays(rec)
+        if len(node_ids) < 5:
+            continue
+        result = analyze_path(rec, threshold, use_half_hint=False)
+        if result['status'] != 'OK' or result['regenerators']:
+            continue
+        report['checked'] += 1
+        ours = result['opcs'][0] if result['opcs'] else None
+        hint = node_ids[half_index]
+        if ours == hint:
+            report['agree'] += 1
+        else:
+            report['disagree'] += 1
+            if len(report['examples']) < max_examples:
+                report['examples'].append((rec['source'], rec['destination'], hint, ours))
+    return report
+
+def empty_totals():
+    """
+    Network-wide aggregates over a stream of analysis results.
+    """
+    return {
+        'paths': 0,
+        'ok': 0,
+        'unreachable': 0,
+        'regenerators': 0,
+        'opcs': 0,
+        'residual_distance': 0.0
+    }
+
+def add_to_totals(totals, result):
+    totals['paths'] += 1
+    if result['status'] == 'OK':
+        totals['ok'] += 1
+    else:
+        totals['unreachable'] += 1
+    totals['regenerators'] += len(result['regenerators'])
+    totals['opcs'] += len(result['opcs'])
+    totals['residual_distance'] += result['residual_distance']
+    return totals
+
+def format_totals(totals):
+    return (f"{totals['paths']} paths ({totals['unreachable']} unreachable), "
+            f"{totals['regenerators']} regenerators, {totals['opcs']} OPCs, "
+            f"total residual {totals['residual_distance']:.2f} km")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+path_sampling.py
+
+Fast estimates of the network totals for very large Simon files: instead of
+analyzing every line, draw a stratified random sample in one streaming pass
+and analyze only that.
+
+  1) Every path line is assigned to a stratum (source node, Cost band), where
+     the band is int(Cost // band_km). Only the "SRC->DST (Cost: X)" header
+     is matched for this; the node list isn't parsed.
+  2) Each stratum keeps a reservoir of at most 'per_stratum' lines
+     (Algorithm R), plus the exact number of lines it saw.
+  3) The sampled lines are parsed and run through analyze_path().
+  4) Stratified estimator per metric:
+        total  = sum_h N_h * mean_h
+        var    = sum_h N_h^2 * (1 - n_h/N_h) * s_h^2 / n_h
+     with a normal confidence interval total +- z * sqrt(var).
+     Strata that were sampled completely (n_h == N_h) are exact.
+
+Estimated metrics: regenerators, opcs, unreachable (pairs) and
+residual_distance. The number of paths is counted exactly.
+"""
+
+import math
+import random
+import statistics
+
+import input_parser
+import path_analyzer
+
+SAMPLED_METRICS = ('regenerators', 'opcs', 'unreachable', 'residual_distance')
+
+def stratum_of(line, band_km):
+    """
+    (source, cost band) of a stripped path line, or None if it isn't one.
+    """
+    if not line or line.startswith("#"):
+        return None
+    m = input_parser.line_pattern.match(line)
+    if not m:
+        return None
+    try:
+        cost = float(m.group(3))
+    except ValueError:
+        cost = 0.0
+    return int(m.group(1)), int(cost // band_km)
+
+def reservoir_sample_file(filepath, per_stratum, band_km=1000.0, seed=None):
+    """
+    One pass over 'filepath'. Returns { stratum: (lines_seen, [sampled lines]) }.
+    """
+    if per_stratum < 2:
+        raise ValueError("per_stratum must be >= 2 to estimate the variance")
+    rng = random.Random(seed)
+    seen = {}
+    reservoirs = {}
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            key = stratum_of(line, band_km)
+            if key is None:
+                continue
+            count = seen.get(key, 0) + 1
+            seen[key] = count
+            reservoir = reservoirs.get(key)
+            if reservoir is None:
+                reservoir = reservoirs[key] = []
+            if count <= per_stratum:
+                reservoir.append(line)
+            else:
+                j = rng.randrange(count)
+                if j < per_stratum:
+                    reservoir[j] = line
+    return {key: (seen[key], reservoirs[key]) for key in seen}
+
+def _metric_values(result):
+    return {
+        'regenerators': len(result['regenerators']),
+        'opcs': len(result['opcs']),
+        'unreachable': 0 if result['status'] == 'OK' else 1,
+        'residual_distance': result['residual_distance']
+    }
+
+def estimate_totals(strata, threshold=None, confidence=0.95):
+    """
+    Analyzes the sampled lines and returns
+      {
+        'paths': int (exact),
+        'sampled': int,
+        'strata': int,
+        'confidence': float,
+        'estimates': { metric: {'estimate', 'low', 'high', 'stderr'} }
+      }
+    """
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence/2.0)
+    totals = {name: 0.0 for name in SAMPLED_METRICS}
+    variances = {name: 0.0 for name in SAMPLED_METRICS}
+    paths = 0
+    sampled = 0
+
+    for seen, lines in strata.values():
+        values = {name: [] for name in SAMPLED_METRICS}
+        for line in lines:
+            rec = input_parser.parse_simon_line(line)
+            for name, v in _metric_values(path_analyzer.analyze_path(rec, threshold)).items():
+                values[name].append(v)
+        n = len(lines)
+        paths += seen
+        sampled += n
+        for name in SAMPLED_METRICS:
+            vals = values[name]
+            totals[name] += seen * statistics.fmean(vals)
+            if n < seen:
+                variances[name] += seen * seen * (1.0 - n/seen) * statistics.variance(vals) / n
+
+    estimates = {}
+    for name in SAMPLED_METRICS:
+        stderr = math.sqrt(variances[name])
+        estimates[name] = {
+            'estimate': totals[name],
+            'low': max(0.0, totals[name] - z*stderr),
+            'high': totals[name] + z*stderr,
+            'stderr': stderr
+        }
+    return {
+        'paths': paths,
+        'sampled': sampled,
+        'strata': len(strata),
+        'confidence': confidence,
+        'estimates': estimates
+    }
+
+def format_estimates(report):
+    lines = [f"Sampled {report['sampled']} of {report['paths']} paths "
+             f"in {report['strata']} strata (source x Cost band). "
+             f"Estimated totals, {report['confidence']:.0%} confidence interval:"]
+    for name in SAMPLED_METRICS:
+        e = report['estimates'][name]
+        lines.append(f"  {name:<18} {e['estimate']:>14.2f}  [{e['low']:.2f}, {e['high']:.2f}]")
+    return "\n".join(lines)
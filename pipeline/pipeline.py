@@ -1,62 +1,47 @@
-# import graphviz
+"""
+pipeline.py
 
-# def create_pipeline_flowchart_graphviz_vertical(output_filepath="pipeline_flowchart_vertical.svg"):
-#     """Generates a VERTICAL pipeline flowchart SVG using Graphviz."""
+The NPARC pipeline, both as a diagram and as something you can run.
 
-#     dot = graphviz.Digraph('pipeline_vertical', comment='Optical Network Analysis Pipeline (Vertical)',
-#                            graph_attr={'rankdir': 'TB',  # Changed to Top-to-Bottom layout
-#                                        'bgcolor': 'transparent',
-#                                        'margin': '20', # Add margin for better spacing
-#                                        'compound': 'true'}) # Enable subgraphs for clusters
-#     dot.attr('node', shape='box', style='filled', fillcolor='#e0e0e0', fontname='Helvetica', fontsize='12')
-#     dot.attr('edge', arrowhead='vee', arrowtail='tee', arrowsize='0.8', fontname='Helvetica', fontsize='10')
+  - create_vertical_pipeline_flowchart_graphviz_refined(): the static flowchart.
+  - Pipeline: an executable staged runner. A source reads the Simon file in
+    line batches; each Stage (parse, analyze, write, ...) pulls batches from
+    a bounded queue, and can fan out over several worker threads (I/O bound
+    stages) or a process pool (CPU bound stages, e.g. analysis). Every stage
+    records busy time, records/s and the depth of its input queue, so the
+    slow stage is visible. render_pipeline_metrics() draws the stages with
+    the measured throughput.
 
-#     # Nodes
-#     with dot.subgraph(name='cluster_simon', graph_attr={'label': '1. Simon Simulator', 'labelloc': 't', 'style': 'rounded, bold', 'color': 'black'}) as simon_cluster:
-#         simon_cluster.node('simon_simulator', label='Simon Simulator\n(Black Box)', shape='box', style='filled', fillcolor='#f0f0f0')
-#         simon_cluster.node('topology_input', label='Input:\nTopology File', shape='plaintext', fontsize='13')
-#         simon_cluster.node('simon_output', label='Output:\nsimon_output_us_topology.txt', shape='plaintext', fontsize='13')
+Usage:
+    python pipeline/pipeline.py                     # flowchart only
+    python pipeline/pipeline.py run <input_file> [output_csv]
+        [--batch-size N] [--queue-size N] [--parse-workers N]
+        [--parse-mode thread|process] [--analyze-workers N]
+        [--render metrics.svg]
 
-#     with dot.subgraph(name='cluster_nparc', graph_attr={'label': '2. NPARC Python Tool', 'labelloc': 't', 'style': 'rounded, bold', 'color': 'blue', 'fillcolor': '#cce0ff', 'bgcolor': '#cce0ff'}) as nparc_cluster:
-#         nparc_cluster.attr('node', shape='box', style='filled', fillcolor='#cce0ff')
-#         nparc_cluster.node('input_parser', label='2a. Input Parser\n(input_parser.py)')
-#         nparc_cluster.node('path_analyzer', label='2b. Path Analyzer\n(path_analyzer.py)')
-#         nparc_cluster.node('output_formatter', label='2c. Output Formatter\n(output_formatter.py)')
-#         nparc_cluster.node('parsed_data', label='Parsed Path Data', shape='plaintext', fontsize='13')
-#         nparc_cluster.node('analysis_data', label='Analysis Results', shape='plaintext', fontsize='13')
-#         nparc_cluster.node('csv_data', label='Formatted CSV Data', shape='plaintext', fontsize='13')
+Batches carry a sequence number and the sink writes them back in input
+order, so the CSV is the same as main.py's.
+"""
 
+import argparse
+import concurrent.futures
+import functools
+import os
+import queue
+import sys
+import threading
+import time
 
-#     with dot.subgraph(name='cluster_csv_output', graph_attr={'label': '3. CSV Output File', 'labelloc': 't', 'style': 'rounded, bold', 'color': 'black'}) as csv_cluster:
-#         csv_cluster.node('csv_file_output', label='CSV Output File\npath_analysis_output.csv', shape='box', style='filled', fillcolor='#ccffcc')
-#         csv_cluster.node('analysis_results_label', label='Analysis Results', shape='plaintext', fontsize='13')
+# the NPARC modules live one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-
-#     # Edges (Data Flow) - Adjusted for Vertical Layout - Simpler Connections
-#     dot.edge('topology_input', 'simon_simulator', label='Topology Data', style='dashed', color='black')
-#     dot.edge('simon_simulator', 'simon_output', style='solid', color='black')
-#     dot.edge('simon_output', 'input_parser', label='Simon Output\n(simon_output_us_topology.txt)')
-#     dot.edge('input_parser', 'parsed_data', label='Parsed Path Data')
-#     dot.edge('parsed_data', 'path_analyzer', label='Parsed Data')
-#     dot.edge('path_analyzer', 'analysis_data', label='Analysis Results')
-#     dot.edge('analysis_data', 'output_formatter', label='Analysis Data')
-#     dot.edge('output_formatter', 'csv_data', label='Formatted CSV Data')
-#     dot.edge('csv_data', 'csv_file_output', label='Contains', style='dashed', color='black')
-
-
-#     dot.render(output_filepath, view=False, format='svg') # Generate SVG file
-#     print(f"Vertical Flowchart SVG saved to: {output_filepath}")
-
-
-# if __name__ == '__main__':
-#     create_pipeline_flowchart_graphviz_vertical()
-
-
-
-import graphviz
+import input_parser
+import output_formatter
+import path_analyzer
 
 def create_vertical_pipeline_flowchart_graphviz_refined(output_filepath="pipeline_flowchart_vertical_refined.svg"):
     """Generates a refined vertical pipeline flowchart SVG using Graphviz with spacing adjustments."""
+    import graphviz
 
     dot = graphviz.Digraph('vertical_pipeline_refined', comment='Refined Vertical Optical Network Analysis Pipeline',
                            graph_attr={'rankdir': 'TB', 'bgcolor': 'transparent', 'compound': 'true', 'nodesep': '0.6', 'ranksep': '0.8'}) # Increased ranksep and nodesep for spacing
@@ -110,5 +95,311 @@ def create_vertical_pipeline_flowchart_graphviz_refined(output_filepath="pipelin
     print(f"Vertical Flowchart SVG saved to: {output_filepath}")
 
 
+_END = object()
+
+class Stage:
+    """
+    One pipeline step. 'func' takes a batch (list) and returns a batch.
+    mode='thread' runs it in 'workers' threads; mode='process' sends each
+    batch to a pool of 'workers' processes (func must be picklable, i.e. a
+    module-level function or a functools.partial of one).
+    """
+
+    def __init__(self, name, func, workers=1, mode='thread'):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"mode must be 'thread' or 'process', got {mode!r}")
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.mode = mode
+        self.metrics = None
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, workers={self.workers}, mode={self.mode!r})"
+
+def _new_metrics(name, workers, mode):
+    return {
+        'stage': name,
+        'workers': workers,
+        'mode': mode,
+        'batches': 0,
+        'records_in': 0,
+        'records_out': 0,
+        'busy_seconds': 0.0,
+        'wall_seconds': 0.0,
+        'queue_max': 0,
+        'queue_sum': 0,
+    }
+
+class Pipeline:
+    """
+    source -> stage 1 -> ... -> stage n -> sink
+
+    'source' is an iterable of batches; 'sink' is called with each output
+    batch of the last stage, in source order, from a single thread.
+    """
+
+    def __init__(self, source, stages, sink, queue_size=8):
+        self.source = source
+        self.stages = list(stages)
+        self.sink = sink
+        self.queue_size = queue_size
+        self.metrics = []
+
+    def _run_stage(self, stage, in_q, out_q, pool, lock, errors):
+        m = stage.metrics
+        while True:
+            depth = in_q.qsize()
+            item = in_q.get()
+            if item is _END:
+                return
+            seq, batch = item
+            if errors:
+                continue  # drain, so upstream never blocks
+            with lock:
+                m['queue_max'] = max(m['queue_max'], depth)
+                m['queue_sum'] += depth
+            t0 = time.perf_counter()
+            try:
+                if pool is not None:
+                    out = pool.submit(stage.func, batch).result()
+                else:
+                    out = stage.func(batch)
+            except BaseException as e:
+                errors.append(e)
+                continue
+            busy = time.perf_counter() - t0
+            with lock:
+                m['batches'] += 1
+                m['records_in'] += len(batch)
+                m['records_out'] += len(out)
+                m['busy_seconds'] += busy
+            out_q.put((seq, out))
+
+    def _feed(self, out_q, errors, m):
+        seq = 0
+        source = iter(self.source)
+        try:
+            while True:
+                # busy is the time spent producing batches, not waiting on a full queue
+                t0 = time.perf_counter()
+                batch = next(source, _END)
+                m['busy_seconds'] += time.perf_counter() - t0
+                if batch is _END or errors:
+                    break
+                m['batches'] += 1
+                m['records_out'] += len(batch)
+                out_q.put((seq, batch))
+                seq += 1
+        except BaseException as e:
+            errors.append(e)
+
+    def _drain(self, in_q, errors, m):
+        # reorder buffer: stages with several workers finish batches out of order
+        pending = {}
+        next_seq = 0
+        while True:
+            depth = in_q.qsize()
+            item = in_q.get()
+            if item is _END:
+                break
+            seq, batch = item
+            m['queue_max'] = max(m['queue_max'], depth)
+            m['queue_sum'] += depth
+            pending[seq] = batch
+            while next_seq in pending:
+                batch = pending.pop(next_seq)
+                next_seq += 1
+                if errors:
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    self.sink(batch)
+                except BaseException as e:
+                    errors.append(e)
+                    continue
+                m['batches'] += 1
+                m['records_in'] += len(batch)
+                m['busy_seconds'] += time.perf_counter() - t0
+
+    def run(self):
+        """
+        Runs the pipeline to completion and returns the per-stage metrics
+        (source first, sink last). Re-raises the first error of any stage.
+        """
+        start = time.perf_counter()
+        errors = []
+        lock = threading.Lock()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+
+        source_m = _new_metrics('source', 1, 'thread')
+        sink_m = _new_metrics('sink', 1, 'thread')
+        pools = []
+        stage_threads = []
+        for i, stage in enumerate(self.stages):
+            stage.metrics = _new_metrics(stage.name, stage.workers, stage.mode)
+            pool = None
+            if stage.mode == 'process':
+                pool = concurrent.futures.ProcessPoolExecutor(max_workers=stage.workers)
+                pools.append(pool)
+            threads = [
+                threading.Thread(target=self._run_stage,
+                                 args=(stage, queues[i], queues[i+1], pool, lock, errors),
+                                 name=f"{stage.name}-{w}", daemon=True)
+                for w in range(stage.workers)
+            ]
+            stage_threads.append(threads)
+
+        feeder = threading.Thread(target=self._feed, args=(queues[0], errors, source_m), daemon=True)
+        drainer = threading.Thread(target=self._drain, args=(queues[-1], errors, sink_m), daemon=True)
+        try:
+            drainer.start()
+            for threads in stage_threads:
+                for t in threads:
+                    t.start()
+            feeder.start()
+
+            # close each stage once everything upstream of it is done
+            feeder.join()
+            source_m['wall_seconds'] = time.perf_counter() - start
+            for i, threads in enumerate(stage_threads):
+                for _ in threads:
+                    queues[i].put(_END)
+                for t in threads:
+                    t.join()
+                self.stages[i].metrics['wall_seconds'] = time.perf_counter() - start
+            queues[-1].put(_END)
+            drainer.join()
+            sink_m['wall_seconds'] = time.perf_counter() - start
+        finally:
+            for pool in pools:
+                pool.shutdown()
+
+        self.metrics = [source_m] + [stage.metrics for stage in self.stages] + [sink_m]
+        for m in self.metrics:
+            records = m['records_in'] or m['records_out']
+            # what the stage sustains while working: busy time is summed over its
+            # workers, so that's records per busy second times the worker count.
+            # Wall time would give every stage about the same rate, the source's.
+            m['records_per_second'] = records * m['workers'] / m['busy_seconds'] if m['busy_seconds'] > 0 else 0.0
+            m['queue_mean'] = m['queue_sum'] / m['batches'] if m['batches'] else 0.0
+        if errors:
+            raise errors[0]
+        return self.metrics
+
+def iter_line_batches(filepath, batch_size=1000):
+    """
+    Source for the NPARC pipeline: the raw lines of a Simon file, in batches.
+    """
+    batch = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def build_nparc_pipeline(input_file, csvfile, batch_size=1000, queue_size=8,
+                         parse_workers=1, parse_mode='thread', analyze_workers=None,
+                         threshold=None):
+    """
+    read -> parse -> analyze -> write, writing CSV rows to the open 'csvfile'.
+    Analysis runs in a process pool of analyze_workers (default: CPU count);
+    parsing is also CPU bound, so parse_mode='process' helps when it becomes
+    the slowest stage.
+    """
+    if analyze_workers is None:
+        analyze_workers = os.cpu_count() or 1
+    writer = output_formatter.open_csv_writer(csvfile)
+
+    def write_rows(results):
+        writer.writerows(output_formatter.format_csv_row(r) for r in results)
+
+    stages = [
+        Stage('parse', input_parser.parse_simon_lines, workers=parse_workers, mode=parse_mode),
+        Stage('analyze', functools.partial(path_analyzer.analyze_all_paths, threshold=threshold),
+              workers=analyze_workers, mode='process'),
+    ]
+    return Pipeline(iter_line_batches(input_file, batch_size), stages, write_rows, queue_size)
+
+def format_pipeline_metrics(metrics):
+    lines = [f"{'stage':<10} {'workers':>12} {'batches':>8} {'records':>9} "
+             f"{'busy s':>8} {'rec/s':>10} {'queue max':>9} {'queue avg':>9}"]
+    for m in metrics:
+        lines.append(
+            f"{m['stage']:<10} {str(m['workers']) + ' x ' + m['mode']:>12} {m['batches']:>8} "
+            f"{m['records_in'] or m['records_out']:>9} {m['busy_seconds']:>8.2f} "
+            f"{m['records_per_second']:>10.0f} {m['queue_max']:>9} {m['queue_mean']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+def render_pipeline_metrics(metrics, output_filepath="pipeline_metrics.svg"):
+    """
+    Draws the stages of a finished run left to right, each labeled with its
+    fan-out and measured throughput; the edges show the queue depth.
+    """
+    import graphviz
+
+    dot = graphviz.Digraph('pipeline_metrics', comment='NPARC Pipeline Run',
+                           graph_attr={'rankdir': 'LR', 'bgcolor': 'transparent', 'nodesep': '0.6'})
+    dot.attr('node', shape='box', style='filled', fillcolor='#cce0ff', fontname='Helvetica', fontsize='12')
+    dot.attr('edge', arrowhead='vee', arrowsize='0.7', fontname='Helvetica', fontsize='10')
+
+    slowest = min(metrics, key=lambda m: m['records_per_second'] or float('inf'))
+    for m in metrics:
+        label = (f"{m['stage']}\n{m['workers']} x {m['mode']}\n"
+                 f"{m['records_per_second']:,.0f} records/s\nbusy {m['busy_seconds']:.2f} s")
+        fill = '#ffcccc' if m is slowest else '#cce0ff'
+        dot.node(m['stage'], label=label, fillcolor=fill)
+    for prev, m in zip(metrics, metrics[1:]):
+        dot.edge(prev['stage'], m['stage'],
+                 label=f"queue max {m['queue_max']}\navg {m['queue_mean']:.1f}")
+
+    dot.render(output_filepath, view=False, format='svg')
+    print(f"Pipeline metrics SVG saved to: {output_filepath}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NPARC pipeline flowchart and staged runner.")
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('flowchart', help="render the static pipeline flowchart (default)")
+    run = sub.add_parser('run', help="run the staged pipeline on a Simon output file")
+    run.add_argument('input_file')
+    run.add_argument('output_csv', nargs='?', default='path_analysis_output.csv')
+    run.add_argument('--batch-size', type=int, default=1000)
+    run.add_argument('--queue-size', type=int, default=8)
+    run.add_argument('--parse-workers', type=int, default=1)
+    run.add_argument('--parse-mode', choices=['thread', 'process'], default='thread')
+    run.add_argument('--analyze-workers', type=int, default=None)
+    run.add_argument('--render', metavar='SVG', default=None,
+                     help="render the stages annotated with measured throughput")
+    args = parser.parse_args(argv)
+
+    if args.command != 'run':
+        create_vertical_pipeline_flowchart_graphviz_refined()
+        return
+
+    os.makedirs("output", exist_ok=True)
+    output_csv_path = os.path.join("output", args.output_csv)
+    with open(output_csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        pipeline = build_nparc_pipeline(
+            args.input_file, csvfile,
+            batch_size=args.batch_size,
+            queue_size=args.queue_size,
+            parse_workers=args.parse_workers,
+            parse_mode=args.parse_mode,
+            analyze_workers=args.analyze_workers
+        )
+        metrics = pipeline.run()
+
+    print(format_pipeline_metrics(metrics))
+    print(f"Results in {output_csv_path}")
+    if args.render:
+        render_pipeline_metrics(metrics, args.render)
+
+
 if __name__ == '__main__':
-    create_vertical_pipeline_flowchart_graphviz_refined()
\ No newline at end of file
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+progress.py
+
+Progress and throughput telemetry for long streaming runs.
+
+The streaming loop keeps its own row counter and only calls in here at
+sample boundaries:
+  - add_timing(): every SAMPLE_EVERY rows, one record's parse and analyze
+    time is measured; the per-stage rates come from these samples
+  - report_at(): every 'every' rows, the rates are computed and
+      - one progress line goes to stderr, and
+      - if a metrics file is set, it is rewritten in the Prometheus text
+        format (written to a temp file and renamed, so the node exporter's
+        textfile collector never reads a half-written file).
+
+Reported: bytes read (and % of the input), rows written, parse and analyze
+rates (sampled paths per second of time spent in each stage), overall rows/s,
+the current UNREACHABLE count, and an ETA from the remaining input bytes.
+"""
+
+import os
+import sys
+import time
+
+# rows between timed records
+SAMPLE_EVERY = 64
+
+def _escape_label_value(value):
+    # Prometheus text format: backslash, double quote and newline are escaped
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+class ProgressReporter:
+    def __init__(self, input_size, every=100000, metrics_path=None, stream=None,
+                 start_offset=0, start_rows=0, label=None):
+        self.input_size = input_size
+        self.every = every
+        self.metrics_path = metrics_path
+        self.stream = stream if stream is not None else sys.stderr
+        self.label = label or ""
+        self.start_offset = start_offset
+        self.start_rows = start_rows
+        self.start_time = time.perf_counter()
+        self.rows = start_rows
+        self.offset = start_offset
+        self.unreachable = 0
+        self.parse_seconds = 0.0
+        self.analyze_seconds = 0.0
+        self.timed = 0
+
+    def add_timing(self, parse_seconds, analyze_seconds):
+        """
+        One sampled record's parse and analyze time.
+        """
+        self.parse_seconds += parse_seconds
+        self.analyze_seconds += analyze_seconds
+        self.timed += 1
+
+    def report_at(self, offset, totals, done=False):
+        """
+        Reports with the input offset reached and the running totals.
+        """
+        self.offset = offset
+        self.rows = totals['paths']
+        self.unreachable = totals['unreachable']
+        self.report(done)
+
+    def snapshot(self, done=False):
+        elapsed = time.perf_counter() - self.start_time
+        rows = self.rows - self.start_rows
+        read = self.offset - self.start_offset
+        remaining = max(self.input_size - self.offset, 0)
+        if done:
+            eta = 0.0
+        elif read > 0:
+            eta = remaining * elapsed / read
+        else:
+            eta = None
+        return {
+            'bytes_read': self.offset,
+            'input_bytes': self.input_size,
+            'progress_ratio': self.offset / self.input_size if self.input_size else 1.0,
+            'rows_written': self.rows,
+            'unreachable': self.unreachable,
+            'parse_paths_per_second': self.timed / self.parse_seconds if self.parse_seconds > 0 else 0.0,
+            'analyze_paths_per_second': self.timed / self.analyze_seconds if self.analyze_seconds > 0 else 0.0,
+            'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+            'elapsed_seconds': elapsed,
+            'eta_seconds': eta,
+            'done': done
+        }
+
+    def report(self, done=False):
+        s = self.snapshot(done)
+        eta = _format_duration(s['eta_seconds']) if s['eta_seconds'] is not None else "?"
+        print(f"[progress] {s['rows_written']:,} rows, "
+              f"{s['bytes_read'] / 1e6:,.1f}/{s['input_bytes'] / 1e6:,.1f} MB ({s['progress_ratio']:.1%}), "
+              f"parse {s['parse_paths_per_second']:,.0f}/s, analyze {s['analyze_paths_per_second']:,.0f}/s, "
+              f"overall {s['rows_per_second']:,.0f} rows/s, {s['unreachable']:,} unreachable, "
+              f"{'done' if done else 'ETA ' + eta}",
+              file=self.stream, flush=True)
+        if self.metrics_path:
+            self.write_metrics(s)
+
+    def write_metrics(self, s):
+        labels = f'{{input="{_escape_label_value(self.label)}"}}' if self.label else ""
+        metrics = [
+            ('nparc_input_bytes', 'Size of the input file in bytes.', s['input_bytes']),
+            ('nparc_input_bytes_read', 'Input bytes processed so far.', s['bytes_read']),
+            ('nparc_progress_ratio', 'Fraction of the input processed.', s['progress_ratio']),
+            ('nparc_rows_written', 'Result rows written so far.', s['rows_written']),
+            ('nparc_unreachable_paths', 'UNREACHABLE paths so far.', s['unreachable']),
+            ('nparc_parse_paths_per_second', 'Paths parsed per second of parse time (sampled records).',
+             s['parse_paths_per_second']),
+            ('nparc_analyze_paths_per_second', 'Paths analyzed per second of analysis time (sampled records).',
+             s['analyze_paths_per_second']),
+            ('nparc_rows_per_second', 'Overall rows written per second of wall time.', s['rows_per_second']),
+            ('nparc_elapsed_seconds', 'Wall time since the run started.', s['elapsed_seconds']),
+            ('nparc_eta_seconds', 'Estimated seconds until the input is done (-1 if unknown).',
+             s['eta_seconds'] if s['eta_seconds'] is not None else -1),
+            ('nparc_run_complete', '1 once the run has finished.', 1 if s['done'] else 0),
+            ('nparc_last_update_timestamp_seconds', 'Unix time of this update.', time.time()),
+        ]
+        lines = []
+        for name, help_text, value in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{labels} {value}")
+        tmp_path = self.metrics_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.metrics_path)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+reach_classes.py
+
+Multi-reach-class analysis: several transponder types with different reaches
+and costs, and for every path the class that makes it cheapest.
+
+Reach class table (one class per line, '#' starts a comment):
+   NAME REACH_KM TRANSPONDER_COST [REGENERATOR_COST]
+
+Example:
+  short  1200  1.0
+  metro  2000  1.4  2.6
+  long   3000  2.2
+
+A lightpath of class c costs 2 transponders (one per end) plus one
+REGENERATOR_COST per regenerator, which defaults to two transponders
+(a back-to-back pair):
+    cost(c) = 2 * TRANSPONDER_COST + regenerators(c) * REGENERATOR_COST
+A class whose reach leaves the path UNREACHABLE is not a choice for it. Ties
+go to the class listed first.
+
+Per path, the sub-array and its total distance are built once and shared by
+all classes. For each class only the regenerator walk of analyze_path() is
+repeated (count_regenerators(), same comparisons and summation order, so the
+counts are exactly analyze_path()'s). analyze_sub_array() then runs once on
+the same sub-array, at the chosen class's reach, for the placements.
+"""
+
+from path_analyzer import analyze_path, analyze_sub_array, build_sub_array
+from records import path_arrays
+
+def load_reach_classes(filepath):
+    """
+    Returns the classes in file order, as dicts
+      { 'name', 'reach_km', 'transponder_cost', 'regenerator_cost' }
+    """
+    classes = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            tokens = line.replace(',', ' ').split()
+            if len(tokens) not in (3, 4):
+                raise ValueError(f"{filepath}:{line_no}: expected 'NAME REACH_KM TRANSPONDER_COST "
+                                 f"[REGENERATOR_COST]', got {line!r}")
+            name = tokens[0]
+            reach_km = float(tokens[1])
+            transponder_cost = float(tokens[2])
+            regenerator_cost = float(tokens[3]) if len(tokens) == 4 else 2 * transponder_cost
+            if reach_km <= 0 or transponder_cost < 0 or regenerator_cost < 0:
+                raise ValueError(f"{filepath}:{line_no}: reach must be > 0 and costs >= 0, got {line!r}")
+            if any(c['name'] == name for c in classes):
+                raise ValueError(f"{filepath}:{line_no}: duplicate class name {name!r}")
+            classes.append({
+                'name': name,
+                'reach_km': reach_km,
+                'transponder_cost': transponder_cost,
+                'regenerator_cost': regenerator_cost
+            })
+    if not classes:
+        raise ValueError(f"{filepath}: no reach classes")
+    return classes
+
+def count_regenerators(sub_distances, total_sub_distance, reach):
+    """
+    The number of regenerators analyze_path() places at this reach, or None
+    if the path is UNREACHABLE at it.
+    """
+    if total_sub_distance <= reach:
+        return 0
+    last = len(sub_distances) - 1  # last valid sub-array index for a regenerator
+    local_dist = 0.0
+    count = 0
+    for i in range(1, len(sub_distances) + 1):
+        dist_incr = sub_distances[i-1]
+        local_dist += dist_incr
+        if local_dist > reach:
+            if not 1 <= i-1 <= last:
+                return None
+            count += 1
+            local_dist = dist_incr
+            if local_dist > reach:
+                return None
+    return count
+
+def path_cost(reach_class, regenerators):
+    return 2 * reach_class['transponder_cost'] + regenerators * reach_class['regenerator_cost']
+
+def choose_reach_class(path_record, classes):
+    """
+    Returns (chosen, result, counts, costs):
+      chosen  index of the cheapest class, or -1 if no class reaches
+      result  analyze_path() at the chosen class's reach (at the longest
+              reach, and UNREACHABLE, if none reaches)
+      counts  regenerators per class, None where the class doesn't reach
+      costs   path cost per class, None where the class doesn't reach
+    """
+    node_ids, distances = path_arrays(path_record)
+    sub_nodes = None
+    if len(node_ids) < 3:
+        counts = [None] * len(classes)
+    else:
+        sub_nodes, sub_distances = build_sub_array(list(node_ids), list(distances))
+        total_sub_distance = sum(sub_distances)
+        counts = [count_regenerators(sub_distances, total_sub_distance, c['reach_km']) for c in classes]
+
+    chosen = -1
+    best_cost = None
+    costs = []
+    for k, count in enumerate(counts):
+        if count is None:
+            costs.append(None)
+            continue
+        cost = path_cost(classes[k], count)
+        costs.append(cost)
+        if best_cost is None or cost < best_cost:
+            chosen = k
+            best_cost = cost
+
+    if chosen >= 0:
+        reach = classes[chosen]['reach_km']
+    else:
+        reach = max(c['reach_km'] for c in classes)
+    if sub_nodes is None:
+        # fewer than 3 nodes: analyze_path()'s trivial UNREACHABLE result
+        return chosen, analyze_path(path_record, reach), counts, costs
+    result = analyze_sub_array(path_record['source'], path_record['destination'],
+                               sub_nodes, sub_distances, reach)
+    return chosen, result, counts, costs
+
+def empty_class_summary(classes):
+    """
+    Network-wide figures per class:
+      chosen_*  over the paths that picked this class
+      alone_*   if this class were used for every path (unreachable paths
+                are counted, not costed)
+    plus 'unreachable' (paths no class reaches) and 'total_cost'.
+    """
+    return {
+        'classes': [dict(c, chosen_paths=0, chosen_regenerators=0, chosen_cost=0.0,
+                         alone_unreachable=0, alone_regenerators=0, alone_cost=0.0)
+                    for c in classes],
+        'paths': 0,
+        'unreachable': 0,
+        'total_cost': 0.0
+    }
+
+def add_to_class_summary(summary, chosen, counts, costs):
+    rows = summary['classes']
+    summary['paths'] += 1
+    for row, count, cost in zip(rows, counts, costs):
+        if count is None:
+            row['alone_unreachable'] += 1
+        else:
+            row['alone_regenerators'] += count
+            row['alone_cost'] += cost
+    if chosen < 0:
+        summary['unreachable'] += 1
+        return summary
+    row = rows[chosen]
+    row['chosen_paths'] += 1
+    row['chosen_regenerators'] += counts[chosen]
+    row['chosen_cost'] += costs[chosen]
+    summary['total_cost'] += costs[chosen]
+    return summary
+
+def iter_reach_class_rows(path_records, classes, summary=None):
+    """
+    Streams (result, reach_class, path_cost) per path: the analysis result at
+    the chosen class, its name and the path's cost ('' for both if no class
+    reaches). Updates 'summary' (from empty_class_summary()) if given.
+    """
+    for rec in path_records:
+        chosen, result, counts, costs = choose_reach_class(rec, classes)
+        if summary is not None:
+            add_to_class_summary(summary, chosen, counts, costs)
+        if chosen >= 0:
+            yield result, classes[chosen]['name'], round(costs[chosen], 2)
+        else:
+            yield result, '', ''
+
+def format_class_summary(summary):
+    chosen = ", ".join(f"{c['name']} {c['chosen_paths']}" for c in summary['classes'])
+    return (f"{summary['paths']} paths ({summary['unreachable']} unreachable at every reach); "
+            f"paths per class: {chosen}; total cost {summary['total_cost']:.2f}")
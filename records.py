@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+records.py
+
+Compact record types for the parse -> analyze -> write pipeline.
+
+PathRecord replaces the per-path dict of parse_simon_output_file():
+  - no per-instance __dict__ (__slots__)
+  - node IDs and distances live in two typed arrays instead of a list of
+    (nodeID, distanceToNext) tuples, i.e. 16 bytes per hop instead of a tuple,
+    a float object and a list slot
+  - the original text line is only kept when the parser is asked to
+
+AnalysisResult replaces the seven-key dict returned by analyze_path().
+
+Both are read-only Mappings over the old dict keys (record['nodes'],
+result['regenerators'], 'status' in result, dict(result), .items(), ...), and
+result fields can be assigned with result['status'] = ..., so code written
+against the dicts keeps working. Keys the old dicts didn't have can't be
+added. analyze_path()/write_analysis_to_csv() still accept plain dicts too.
+"""
+
+from array import array
+from collections.abc import Mapping
+
+class PathRecord(Mapping):
+    __slots__ = ('source', 'destination', 'total_cost', '_node_ids', '_distances', 'unparsed_line',
+                 'direction', 'half_index')
+
+    def __init__(self, source, destination, total_cost, node_ids, distances, unparsed_line=None,
+                 half_index=-1):
+        """
+        node_ids[i] is a node on the path, distances[i] the distance from it to
+        node_ids[i+1]; the final node's distance is 0.0 (same as the dict's
+        'nodes' list).
+
+        direction is 0 when the record owns its arrays, and +1 / -1 when it
+        reads a route stored once for both directions (see share_reverse_route()).
+
+        half_index is the position in node_ids of the node named by Simon's
+        "(Half: ... at N)" trailer, or -1 if the line had none. It is only a
+        hint: analyze_path() checks it before using it.
+        """
+        self.source = source
+        self.destination = destination
+        self.total_cost = total_cost
+        # memoryviews (e.g. slices of a shared memory block, see shm_analysis.py)
+        # are kept as they are, without copying
+        self._node_ids = node_ids if isinstance(node_ids, (array, memoryview)) else array('q', node_ids)
+        self._distances = distances if isinstance(distances, (array, memoryview)) else array('d', distances)
+        self.unparsed_line = unparsed_line
+        self.direction = 0
+        self.half_index = half_index
+
+    @property
+    def node_ids(self):
+        if self.direction < 0:
+            return memoryview(self._node_ids)[::-1]
+        return self._node_ids
+
+    @property
+    def distances(self):
+        if self.direction == 0:
+            return self._distances
+        # shared route: _distances is [0.0, d0, ..., d(k-1), 0.0]
+        if self.direction > 0:
+            return memoryview(self._distances)[1:]
+        return memoryview(self._distances)[len(self._node_ids)-1::-1]
+
+    def __reduce__(self):
+        # views can't be pickled: send plain array copies
+        return (PathRecord, (self.source, self.destination, self.total_cost,
+                             array('q', self.node_ids), array('d', self.distances),
+                             self.unparsed_line, self.half_index))
+
+    @property
+    def nodes(self):
+        """
+        The old [ (nodeID, distanceToNext), ... ] list, built on demand.
+        """
+        return list(zip(self.node_ids, self.distances))
+
+    @classmethod
+    def from_dict(cls, path_dict):
+        node_pairs = path_dict['nodes']
+        return cls(
+            path_dict['source'],
+            path_dict['destination'],
+            path_dict.get('total_cost', 0.0),
+            [x[0] for x in node_pairs],
+            [x[1] for x in node_pairs],
+            path_dict.get('unparsed_line')
+        )
+
+    def as_dict(self):
+        return {
+            'source': self.source,
+            'destination': self.destination,
+            'total_cost': self.total_cost,
+            'nodes': self.nodes,
+            'unparsed_line': self.unparsed_line
+        }
+
+    # the keys of the old path dict
+    _KEYS = ('source', 'destination', 'total_cost', 'nodes', 'unparsed_line')
+
+    def __getitem__(self, key):
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+    def __eq__(self, other):
+        if isinstance(other, PathRecord):
+            return (self.source == other.source and self.destination == other.destination
+                    and self.total_cost == other.total_cost
+                    and self.node_ids == other.node_ids and self.distances == other.distances)
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return (f"PathRecord(source={self.source}, destination={self.destination}, "
+                f"total_cost={self.total_cost}, nodes={self.nodes})")
+
+class AnalysisResult(Mapping):
+    __slots__ = ('source', 'destination', 'total_distance', 'regenerators', 'opcs',
+                 'residual_distance', 'status')
+
+    def __init__(self, source, destination, total_distance, regenerators, opcs,
+                 residual_distance, status):
+        self.source = source
+        self.destination = destination
+        self.total_distance = total_distance
+        self.regenerators = regenerators
+        self.opcs = opcs
+        self.residual_distance = residual_distance
+        self.status = status
+
+    @classmethod
+    def from_dict(cls, result_dict):
+        return cls(*(result_dict[k] for k in cls.__slots__))
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.__slots__:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __eq__(self, other):
+        if isinstance(other, AnalysisResult):
+            return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"AnalysisResult({fields})"
+
+def is_reverse_route(record, other):
+    """
+    True if 'other' runs over exactly the nodes and hop distances of 'record',
+    in the opposite direction (e.g. the B->A line of an A->B route).
+    """
+    n = len(record.node_ids)
+    if n < 2 or n != len(other.node_ids) or len(other.distances) != n:
+        return False
+    return (record.node_ids[::-1] == other.node_ids
+            and record.distances[n-2::-1] == other.distances[:n-1])
+
+def share_reverse_route(record, reverse_record):
+    """
+    Makes record and reverse_record (is_reverse_route() must hold) share one
+    stored route. The route is kept once, as the node array plus the distance
+    array padded with a leading 0.0:
+        nodes  = [n0, n1, ..., nk]
+        padded = [0.0, d0, d1, ..., d(k-1), 0.0]
+    Both records reference these two arrays; 'direction' says how to read them.
+    Forward (+1) reads nodes and padded[1:], reverse (-1) reads nodes[::-1] and
+    padded[k::-1] (= d(k-1), ..., d0, 0.0), as memoryviews built on access, so
+    the analysis walks the reverse record from its own source without a copy.
+    """
+    if record.direction == 0:
+        padded = array('d', [0.0])
+        padded.extend(record._distances)
+        record._distances = padded
+        record.direction = 1
+    reverse_record._node_ids = record._node_ids
+    reverse_record._distances = record._distances
+    reverse_record.direction = -record.direction
+    return reverse_record
+
+def path_arrays(path_record):
+    """
+    Returns (node_ids, distances) for either a PathRecord or an old-style
+    path dict, without building the tuple list for PathRecords.
+    """
+    if isinstance(path_record, PathRecord):
+        return path_record.node_ids, path_record.distances
+    node_pairs = path_record['nodes']
+    return [x[0] for x in node_pairs], [x[1] for x in node_pairs]
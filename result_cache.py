@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+result_cache.py
+
+Persistent per-line result cache, so rerunning after a small topology change
+only parses and analyzes the Simon lines that actually changed.
+
+Each cache entry maps
+    blake2b(ANALYZER_VERSION | threshold | normalized line)
+to the analysis result of that line. Lines are normalized by stripping the
+surrounding whitespace/line ending (the same thing the parser does before
+matching), so CRLF vs LF or trailing blanks don't cause misses. Including the
+threshold and path_analyzer.ANALYZER_VERSION in the key means a different
+threshold or a change to the analysis rules never returns a stale result.
+
+The cache is a single SQLite file; lookups and inserts are done in batches.
+"""
+
+import hashlib
+import sqlite3
+
+import input_parser
+import path_analyzer
+from records import AnalysisResult
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key               BLOB PRIMARY KEY,
+    source            INTEGER NOT NULL,
+    destination       INTEGER NOT NULL,
+    total_distance    REAL    NOT NULL,
+    regenerators      TEXT    NOT NULL,
+    opcs              TEXT    NOT NULL,
+    residual_distance REAL    NOT NULL,
+    status            TEXT    NOT NULL
+) WITHOUT ROWID;
+"""
+
+def line_key(line, threshold):
+    """
+    Cache key for one line (already normalized) at the given threshold.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{path_analyzer.ANALYZER_VERSION}|{threshold!r}|".encode('utf-8'))
+    h.update(line.encode('utf-8'))
+    return h.digest()
+
+def _split_ids(text):
+    return [int(x) for x in text.split(';')] if text else []
+
+class ResultCache:
+    """
+    SQLite-backed map from line_key() to AnalysisResult.
+    """
+
+    def __init__(self, cache_path):
+        self.conn = sqlite3.connect(cache_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(CACHE_SCHEMA)
+
+    def lookup_many(self, keys):
+        """
+        Returns { key: AnalysisResult } for the keys present in the cache.
+        """
+        found = {}
+        keys = list(set(keys))
+        # stay below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT * FROM results WHERE key IN ({placeholders})", chunk
+            )
+            for key, src, dst, total, regens, opcs, residual, status in rows:
+                found[key] = AnalysisResult(
+                    source=src,
+                    destination=dst,
+                    total_distance=total,
+                    regenerators=_split_ids(regens),
+                    opcs=_split_ids(opcs),
+                    residual_distance=residual,
+                    status=status
+                )
+        return found
+
+    def store_many(self, items):
+        """
+        items: iterable of (key, result).
+        """
+        rows = [
+            (key, r['source'], r['destination'], r['total_distance'],
+             ";".join(map(str, r['regenerators'])), ";".join(map(str, r['opcs'])),
+             r['residual_distance'], r['status'])
+            for key, r in items
+        ]
+        if not rows:
+            return
+        self.conn.execute("BEGIN")
+        self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_analyze_file_cached(filepath, cache, threshold=None, batch_size=5000, stats=None):
+    """
+    Yields the analysis result of every parsable line of 'filepath', in file
+    order, taking results from 'cache' where possible. Only cache misses are
+    parsed and analyzed, and their results are added to the cache.
+
+    If a dict is passed as 'stats', it is updated with 'hits' and 'misses'.
+    """
+    if threshold is None:
+        threshold = path_analyzer.REGENERATOR_THRESHOLD
+    if stats is None:
+        stats = {}
+    stats.setdefault('hits', 0)
+    stats.setdefault('misses', 0)
+
+    def process(batch):
+        keys = [line_key(line, threshold) for line in batch]
+        cached = cache.lookup_many(keys)
+        new_items = []
+        out = []
+        for line, key in zip(batch, keys):
+            result = cached.get(key)
+            if result is not None:
+                stats['hits'] += 1
+            else:
+                rec = input_parser.parse_simon_line(line)
+                if rec is None:
+                    continue
+                result = path_analyzer.analyze_path(rec, threshold)
+                cached[key] = result  # repeated lines within the batch
+                new_items.append((key, result))
+                stats['misses'] += 1
+            out.append(result)
+        cache.store_many(new_items)
+        return out
+
+    batch = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            batch.append(line)
+            if len(batch) >= batch_size:
+                yield from process(batch)
+                batch = []
+    if batch:
+        yield from process(batch)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+result_ranking.py
+
+Streaming top-K over analysis results: the worst paths by residual distance,
+regenerator count, OPC count or total distance, without materializing or
+sorting the full result set.
+
+A min-heap of size K holds the best K seen so far; each new result is
+compared against the heap root and only pushed if it beats it, so memory is
+O(K) and each result costs O(log K) at most.
+
+Ties are broken by input order (the earlier path ranks higher), so the output
+is deterministic and matches a stable sort of the full CSV.
+"""
+
+import heapq
+
+# field name -> value used for ranking
+RANK_FIELDS = {
+    'residual_distance': lambda r: r['residual_distance'],
+    'total_distance': lambda r: r['total_distance'],
+    'regenerators': lambda r: len(r['regenerators']),
+    'opcs': lambda r: len(r['opcs']),
+    'source': lambda r: r['source'],
+    'destination': lambda r: r['destination'],
+}
+
+def rank_key(field):
+    """
+    Returns the function that extracts 'field' from a result.
+    """
+    try:
+        return RANK_FIELDS[field]
+    except KeyError:
+        raise ValueError(f"cannot rank by {field!r}, choose one of {sorted(RANK_FIELDS)}") from None
+
+def top_k(results, k, by='residual_distance'):
+    """
+    Returns the k results with the largest 'by' value, largest first, from
+    any iterable of results (consumed once).
+    """
+    if k < 1:
+        return []
+    key = rank_key(by)
+    heap = []  # (value, -input index, result); root is the weakest kept entry
+    for seq, result in enumerate(results):
+        entry = (key(result), -seq, result)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    heap.sort(key=lambda e: e[:2], reverse=True)
+    return [result for _, _, result in heap]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+rona.py
+
+In-process library API, for callers that already have the paths in memory and
+don't want to go through a Simon text file and main.py:
+
+    import rona
+    results = rona.analyze(records, threshold=1800.0, workers=4)
+
+'records' can be any iterable (list, generator, DB cursor, ...) whose items are
+one of:
+  - a records.PathRecord as produced by parse_simon_output_file(), or an
+    old-style path dict { 'source', 'destination', 'nodes': [ (nodeID, distanceToNext), ... ] }
+  - a tuple (source, destination, node_ids, distances)
+  - any object with 'source', 'destination' and either a 'nodes' attribute or
+    'node_ids' + 'distances' attributes
+
+distances[i] is the distance from node_ids[i] to node_ids[i+1]; it may have
+len(node_ids) - 1 entries, or len(node_ids) entries with a trailing 0.0.
+
+Nothing touches disk and the threshold is a parameter, so several analyses with
+different thresholds can run side by side in one process.
+"""
+
+import collections
+import itertools
+import multiprocessing
+
+import path_analyzer
+from records import PathRecord
+
+def _path_record_from_arrays(source, destination, node_ids, distances):
+    node_ids = list(node_ids)
+    distances = [float(d) for d in distances]
+    if len(distances) == len(node_ids) - 1:
+        distances.append(0.0)
+    elif len(distances) != len(node_ids):
+        raise ValueError(
+            f"expected {len(node_ids) - 1} or {len(node_ids)} distances for "
+            f"{len(node_ids)} nodes, got {len(distances)}"
+        )
+    return PathRecord(source, destination, sum(distances), node_ids, distances)
+
+def to_path_record(item):
+    """
+    Normalizes one input item into something analyze_path() accepts
+    (a PathRecord, or an old-style dict passed through unchanged).
+    """
+    if isinstance(item, (PathRecord, dict)):
+        return item
+
+    if isinstance(item, (tuple, list)):
+        if len(item) != 4:
+            raise ValueError(f"expected (source, destination, node_ids, distances), got {len(item)} fields")
+        return _path_record_from_arrays(*item)
+
+    if hasattr(item, 'nodes'):
+        return PathRecord.from_dict({
+            'source': item.source,
+            'destination': item.destination,
+            'nodes': list(item.nodes)
+        })
+    return _path_record_from_arrays(item.source, item.destination, item.node_ids, item.distances)
+
+def _analyze_batch(batch, threshold):
+    return [path_analyzer.analyze_path(rec, threshold) for rec in batch]
+
+def iter_analyze(records, threshold=None, workers=1, chunksize=256, max_in_flight=None):
+    """
+    Generator version of analyze(): yields one analysis dict per input record,
+    in input order, as soon as it is ready. The input iterable is consumed
+    lazily: with workers > 1 it is cut into batches of 'chunksize' records and
+    at most 'max_in_flight' batches (default 2 per worker) are submitted but
+    not yet yielded, so at most about chunksize * (max_in_flight + 1) records
+    are held at a time however long the input is.
+    """
+    if threshold is None:
+        threshold = path_analyzer.REGENERATOR_THRESHOLD
+
+    path_records = (to_path_record(item) for item in records)
+
+    if workers is None or workers <= 1:
+        for rec in path_records:
+            yield path_analyzer.analyze_path(rec, threshold)
+        return
+
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    batches = iter(lambda: list(itertools.islice(path_records, chunksize)), [])
+    pending = collections.deque()
+    with multiprocessing.Pool(workers) as pool:
+        for batch in batches:
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().get()
+            pending.append(pool.apply_async(_analyze_batch, (batch, threshold)))
+        while pending:
+            yield from pending.popleft().get()
+
+def analyze(records, threshold=None, workers=1, lazy=False):
+    """
+    Analyzes every path in 'records' and returns the list of analysis dicts
+    (same layout as path_analyzer.analyze_path). With lazy=True returns the
+    iter_analyze() generator instead of a list.
+    """
+    results = iter_analyze(records, threshold=threshold, workers=workers)
+    if lazy:
+        return results
+    return list(results)
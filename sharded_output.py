@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+sharded_output.py
+
+Writes analysis results into N shard CSV files instead of one, partitioned by
+source node (all rows of one source land in the same shard) or by a hash of
+the (source, destination) pair. Each shard file is written by its own worker
+process, so formatting and disk writes scale with cores, and downstream jobs
+can read the shards in parallel.
+
+Files, for output "results.csv" and 4 shards:
+  results.shard-00000-of-00004.csv ... results.shard-00003-of-00004.csv
+  results.manifest.json
+
+Each shard has the usual CSV header. Within a shard, rows keep their input
+order. The manifest lists every shard with its row count, size and sha256:
+{
+  'shard_by': 'source' | 'pair',
+  'num_shards': int,
+  'fieldnames': [...],
+  'total_rows': int,
+  'shards': [ { 'index', 'file', 'rows', 'bytes', 'sha256' }, ... ]
+}
+"""
+
+import csv
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import zlib
+
+import output_formatter
+from records import AnalysisResult
+
+SHARD_BY_CHOICES = ('source', 'pair')
+
+# seconds between liveness checks of the writer processes while blocked on a queue
+POLL_SECONDS = 1.0
+
+def shard_of(source, destination, num_shards, shard_by='source'):
+    """
+    Stable shard index (crc32, so it doesn't depend on Python's hash seed).
+    """
+    if shard_by == 'source':
+        key = str(source)
+    else:
+        key = f"{source}->{destination}"
+    return zlib.crc32(key.encode('ascii')) % num_shards
+
+def shard_file_names(output_csv_path, num_shards):
+    stem, ext = os.path.splitext(output_csv_path)
+    ext = ext or '.csv'
+    names = [f"{stem}.shard-{i:05d}-of-{num_shards:05d}{ext}" for i in range(num_shards)]
+    return names, f"{stem}.manifest.json"
+
+def _shard_writer(index, path, queue, done_queue):
+    """
+    Worker process: formats the row batches it receives (tuples in
+    AnalysisResult field order) and writes one shard, hashing the bytes as
+    they go out.
+    """
+    fieldnames = output_formatter.CSV_FIELDNAMES
+    digest = hashlib.sha256()
+    rows = 0
+    size = 0
+    with open(path, 'wb') as f:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(fieldnames)
+        while True:
+            batch = queue.get()
+            if batch is not None:
+                for fields in batch:
+                    formatted = output_formatter.format_csv_row(AnalysisResult(*fields))
+                    writer.writerow([formatted[k] for k in fieldnames])
+                rows += len(batch)
+            data = buf.getvalue().encode('utf-8')
+            if data:
+                digest.update(data)
+                f.write(data)
+                size += len(data)
+                buf.seek(0)
+                buf.truncate()
+            if batch is None:
+                break
+    done_queue.put({
+        'index': index,
+        'file': os.path.basename(path),
+        'rows': rows,
+        'bytes': size,
+        'sha256': digest.hexdigest()
+    })
+
+def _check_alive(worker, index):
+    if not worker.is_alive() and worker.exitcode != 0:
+        raise RuntimeError(f"shard writer {index} died (exit code {worker.exitcode})")
+
+def _put(queue, item, worker, index):
+    """
+    queue.put() that raises instead of blocking forever if the writer died.
+    """
+    while True:
+        try:
+            queue.put(item, timeout=POLL_SECONDS)
+            return
+        except queue_module.Full:
+            _check_alive(worker, index)
+
+def _collect_summaries(done_queue, workers):
+    """
+    One summary per writer; raises if a writer dies or exits without one.
+    """
+    summaries = []
+    while len(summaries) < len(workers):
+        try:
+            summaries.append(done_queue.get(timeout=POLL_SECONDS))
+        except queue_module.Empty:
+            for i, p in enumerate(workers):
+                _check_alive(p, i)
+            if all(p.exitcode is not None for p in workers):
+                # every writer exited cleanly: what's left must already be in the pipe
+                try:
+                    summaries.append(done_queue.get(timeout=POLL_SECONDS))
+                except queue_module.Empty:
+                    raise RuntimeError(f"{len(workers) - len(summaries)} shard writer(s) "
+                                       f"exited without reporting their shard")
+    return summaries
+
+def write_analysis_to_shards(results, output_csv_path, num_shards, shard_by='source', batch_size=2000):
+    """
+    Streams 'results' (any iterable of analysis results) into num_shards shard
+    files next to output_csv_path and writes the manifest.
+    Returns the manifest dict. Raises RuntimeError if a writer process dies
+    (e.g. on a disk error); the other writers are stopped.
+    """
+    if shard_by not in SHARD_BY_CHOICES:
+        raise ValueError(f"shard_by must be one of {SHARD_BY_CHOICES}, got {shard_by!r}")
+    if num_shards < 1:
+        raise ValueError("num_shards must be >= 1")
+
+    paths, manifest_path = shard_file_names(output_csv_path, num_shards)
+    done_queue = multiprocessing.Queue()
+    queues = []
+    workers = []
+    for i, path in enumerate(paths):
+        q = multiprocessing.Queue(maxsize=16)  # bounded, so a slow disk applies backpressure
+        p = multiprocessing.Process(target=_shard_writer, args=(i, path, q, done_queue))
+        p.start()
+        queues.append(q)
+        workers.append(p)
+
+    pending = [[] for _ in range(num_shards)]
+    try:
+        for row in results:
+            i = shard_of(row['source'], row['destination'], num_shards, shard_by)
+            # the writers do the CSV formatting; only the raw fields cross over
+            pending[i].append((row['source'], row['destination'], row['total_distance'],
+                               row['regenerators'], row['opcs'], row['residual_distance'],
+                               row['status']))
+            if len(pending[i]) >= batch_size:
+                _put(queues[i], pending[i], workers[i], i)
+                pending[i] = []
+        for i in range(num_shards):
+            if pending[i]:
+                _put(queues[i], pending[i], workers[i], i)
+            _put(queues[i], None, workers[i], i)
+        shards = _collect_summaries(done_queue, workers)
+    except BaseException:
+        for q in queues:
+            # batches still buffered for a dead writer must not block our exit
+            q.cancel_join_thread()
+        for p in workers:
+            if p.is_alive():
+                p.terminate()
+        for p in workers:
+            p.join()
+        raise
+
+    for p in workers:
+        p.join()
+    shards.sort(key=lambda s: s['index'])
+
+    fieldnames = output_formatter.CSV_FIELDNAMES
+    manifest = {
+        'shard_by': shard_by,
+        'num_shards': num_shards,
+        'fieldnames': fieldnames,
+        'total_rows': sum(s['rows'] for s in shards),
+        'shards': shards
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+site_consolidation.py
+
+Network-wide regenerator site consolidation.
+
+analyze_path() places regenerators per path with a greedy forward walk, so two
+paths crossing the same corridor may pick different nodes and the network-wide
+plan ends up spread over many sites. This module:
+
+  1) computes, for every path, the feasible window for each of its regenerators
+     (same sub-array and same REGENERATOR_THRESHOLD rules as analyze_path),
+  2) chooses a small set of shared regenerator sites with greedy set cover
+     (lazy priority queue, so each site's gain is only recomputed when popped),
+  3) assigns every path a regenerator chain that only uses the chosen sites.
+
+The k-th regenerator of a minimum-count chain always lies between the k-th
+position of the backward greedy walk and the k-th position of the forward
+greedy walk, so the window [backward_k .. forward_k] is exactly the set of
+nodes that can host it. Each (path, k) pair is one element of the cover.
+
+Picking one site per window does not always give a feasible chain, so every
+path is re-walked over the chosen sites; paths that cannot be served fall back
+to their own per-path regenerators, which are then added to the site list.
+"""
+
+import heapq
+
+import path_analyzer
+from records import path_arrays
+
+def forward_regenerator_indices(sub_distances, threshold):
+    """
+    Same walk as analyze_path: place a regenerator at the last node before the
+    cumulative distance exceeds the threshold. Returns sub-array indices, or
+    None if the path is UNREACHABLE.
+    """
+    sub_n = len(sub_distances) + 1
+    idxs = []
+    local_dist = 0.0
+    for i in range(1, sub_n):
+        dist_incr = sub_distances[i-1]
+        local_dist += dist_incr
+        if local_dist > threshold:
+            if not (1 <= i-1 <= sub_n-2):
+                return None
+            idxs.append(i-1)
+            local_dist = dist_incr
+            if local_dist > threshold:
+                return None
+    return idxs
+
+def backward_regenerator_indices(sub_distances, threshold):
+    """
+    Mirror image of forward_regenerator_indices(): walk from the destination
+    ROADM towards the source ROADM, placing each regenerator as early as
+    possible. Returns sub-array indices in ascending order, or None.
+    """
+    sub_n = len(sub_distances) + 1
+    idxs = []
+    local_dist = 0.0
+    for i in range(sub_n-2, -1, -1):
+        dist_incr = sub_distances[i]  # distance sub_nodes[i] -> sub_nodes[i+1]
+        local_dist += dist_incr
+        if local_dist > threshold:
+            if not (1 <= i+1 <= sub_n-2):
+                return None
+            idxs.append(i+1)
+            local_dist = dist_incr
+            if local_dist > threshold:
+                return None
+    idxs.reverse()
+    return idxs
+
+def feasible_regenerator_windows(path_record, threshold=None):
+    """
+    Returns a dict describing the path in sub-array terms:
+    {
+      'source', 'destination', 'total_distance',
+      'sub_nodes': [...], 'sub_distances': [...],
+      'regenerators': [...],   # per-path placement, as analyze_path does it
+      'windows': [ [nodeID, ...], ... ],  # one list of candidate sites per regenerator
+      'status': 'OK' | 'UNREACHABLE'
+    }
+    """
+    if threshold is None:
+        threshold = path_analyzer.REGENERATOR_THRESHOLD
+
+    node_ids, distances = path_arrays(path_record)
+    full_nodeIDs = list(node_ids)
+    full_distances = list(distances)
+
+    info = {
+        'source': path_record['source'],
+        'destination': path_record['destination'],
+        'total_distance': 0.0,
+        'sub_nodes': [],
+        'sub_distances': [],
+        'regenerators': [],
+        'windows': [],
+        'status': 'UNREACHABLE'
+    }
+    if len(full_nodeIDs) < 3:
+        return info
+
+    sub_nodes, sub_distances = path_analyzer.build_sub_array(full_nodeIDs, full_distances)
+    total_sub_distance = sum(sub_distances)
+    info['sub_nodes'] = sub_nodes
+    info['sub_distances'] = sub_distances
+    info['total_distance'] = round(total_sub_distance, 2)
+
+    if total_sub_distance <= threshold:
+        info['status'] = 'OK'
+        return info
+
+    fwd = forward_regenerator_indices(sub_distances, threshold)
+    if fwd is None:
+        return info
+    bwd = backward_regenerator_indices(sub_distances, threshold)
+    if bwd is None or len(bwd) != len(fwd):
+        # should not happen for a reachable path, but never widen a window we can't prove
+        bwd = fwd
+
+    info['regenerators'] = [sub_nodes[i] for i in fwd]
+    info['windows'] = [
+        [sub_nodes[i] for i in range(min(b, f), f + 1)]
+        for b, f in zip(bwd, fwd)
+    ]
+    info['status'] = 'OK'
+    return info
+
+def greedy_site_cover(windows):
+    """
+    Greedy set cover over the given windows (each a list of candidate sites).
+    A site "covers" every window it appears in; we repeatedly pick the site
+    covering the most still-uncovered windows. Gains only ever decrease, so a
+    stale heap entry is re-pushed with its fresh gain instead of rescanning
+    every site (lazy evaluation). Ties are broken by the smaller node ID.
+    Returns the chosen sites in pick order.
+    """
+    site_elems = {}
+    for e_idx, win in enumerate(windows):
+        for site in set(win):
+            site_elems.setdefault(site, []).append(e_idx)
+
+    covered = [False] * len(windows)
+    heap = [(-len(elems), site) for site, elems in site_elems.items()]
+    heapq.heapify(heap)
+
+    chosen = []
+    remaining = len(windows)
+    while heap and remaining > 0:
+        neg_gain, site = heapq.heappop(heap)
+        elems = site_elems[site]
+        gain = 0
+        for e_idx in elems:
+            if not covered[e_idx]:
+                gain += 1
+        if gain == 0:
+            continue
+        if gain < -neg_gain:
+            heapq.heappush(heap, (-gain, site))
+            continue
+        chosen.append(site)
+        for e_idx in elems:
+            if not covered[e_idx]:
+                covered[e_idx] = True
+                remaining -= 1
+    return chosen
+
+def assign_regenerators(sub_nodes, sub_distances, sites, threshold):
+    """
+    Walk the sub-array from the source ROADM, each time jumping to the farthest
+    chosen site still within the threshold. Returns the list of regenerator
+    nodeIDs, or None if the chosen sites cannot serve this path.
+    """
+    sub_n = len(sub_nodes)
+    regens = []
+    anchor = 0
+    while True:
+        local_dist = 0.0
+        best = None
+        i = anchor + 1
+        while i < sub_n:
+            local_dist += sub_distances[i-1]
+            if local_dist > threshold:
+                break
+            if i == sub_n - 1:
+                return regens
+            if sub_nodes[i] in sites:
+                best = i
+            i += 1
+        if best is None:
+            return None
+        regens.append(sub_nodes[best])
+        anchor = best
+
+def consolidate_regenerator_sites(path_records, threshold=None):
+    """
+    Network-wide placement. Returns (assignments, sites):
+
+    assignments is a list (input order) of dicts:
+      {
+        'source': int,
+        'destination': int,
+        'total_distance': float,
+        'regenerators': [ ... ],   # shared sites used by this path
+        'status': 'OK' | 'UNREACHABLE'
+      }
+    sites is a list of (nodeID, paths_served) sorted by nodeID.
+    """
+    if threshold is None:
+        threshold = path_analyzer.REGENERATOR_THRESHOLD
+
+    infos = [feasible_regenerator_windows(p, threshold) for p in path_records]
+
+    all_windows = []
+    for info in infos:
+        all_windows.extend(info['windows'])
+    sites = set(greedy_site_cover(all_windows))
+
+    assigned = [None] * len(infos)
+    fallback = []
+    for p_idx, info in enumerate(infos):
+        if info['status'] != 'OK':
+            continue
+        if not info['windows']:
+            assigned[p_idx] = []
+            continue
+        chain = assign_regenerators(info['sub_nodes'], info['sub_distances'], sites, threshold)
+        if chain is None:
+            fallback.append(p_idx)
+        else:
+            assigned[p_idx] = chain
+
+    # Paths the cover could not serve get their own per-path sites. Their own
+    # chain is then a subset of the site list, so the re-walk always succeeds.
+    for p_idx in fallback:
+        sites.update(infos[p_idx]['regenerators'])
+    for p_idx in fallback:
+        info = infos[p_idx]
+        assigned[p_idx] = assign_regenerators(info['sub_nodes'], info['sub_distances'], sites, threshold)
+
+    assignments = []
+    served = {}
+    for p_idx, info in enumerate(infos):
+        regens = assigned[p_idx] if assigned[p_idx] is not None else []
+        for nd in regens:
+            served[nd] = served.get(nd, 0) + 1
+        assignments.append({
+            'source': info['source'],
+            'destination': info['destination'],
+            'total_distance': info['total_distance'],
+            'regenerators': regens,
+            'status': info['status']
+        })
+
+    site_list = sorted(served.items())
+    return assignments, site_list
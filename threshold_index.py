@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+threshold_index.py
+
+Exact analysis results for any regenerator threshold without re-running the
+analysis.
+
+analyze_path() only looks at the threshold T in two comparisons:
+  - total_sub_distance <= T     (total_sub_distance = sum(sub_distances))
+  - local_dist > T              (local_dist is a contiguous run of hops,
+                                 accumulated with += from the hop after the
+                                 last anchor)
+So each path's outcome is piecewise constant in T, and can only change at
+one of these values. For every path we compute them exactly the way
+analyze_path() does (same summation order, so the floats are bit-identical),
+sort them, run analyze_path() once per interval, and merge neighbouring
+intervals with the same result:
+
+    breakpoints = [-inf, b1, b2, ...]     (ascending)
+    results     = [r0,   r1, r2, ...]     (r_i holds for b_i <= T < b_(i+1))
+
+A query is then one bisect per path, and the network totals for all
+thresholds form a step function (one step per distinct breakpoint).
+
+Usage:
+  python threshold_index.py build <simon_file> <index_file>
+  python threshold_index.py query <index_file> <threshold> [<output_csv>]
+  python threshold_index.py steps <index_file> [<steps_csv>]
+
+The index file is JSON lines, one path per line.
+"""
+
+import argparse
+import bisect
+import csv
+import json
+import math
+import sys
+
+import input_parser
+import output_formatter
+import path_analyzer
+from records import AnalysisResult, path_arrays
+
+def threshold_breakpoints(path_record):
+    """
+    Every threshold value at which analyze_path(path_record, T) can change,
+    sorted ascending (without -inf).
+    """
+    node_ids, distances = path_arrays(path_record)
+    if len(node_ids) < 3:
+        return []
+    _, sub_distances = path_analyzer.build_sub_array(list(node_ids), list(distances))
+    candidates = {sum(sub_distances)}
+    hops = len(sub_distances)
+    for start in range(hops):
+        local_dist = 0.0
+        for j in range(start, hops):
+            local_dist += sub_distances[j]
+            candidates.add(local_dist)
+    return sorted(c for c in candidates if not math.isnan(c))
+
+def index_path(path_record):
+    """
+    Returns (breakpoints, results) for one path, with breakpoints[0] = -inf
+    and neighbouring equal results merged.
+    """
+    breakpoints = [-math.inf]
+    results = [path_analyzer.analyze_path(path_record, -math.inf)]
+    for b in threshold_breakpoints(path_record):
+        result = path_analyzer.analyze_path(path_record, b)
+        if result != results[-1]:
+            breakpoints.append(b)
+            results.append(result)
+    return breakpoints, results
+
+def result_at(entry, threshold):
+    breakpoints, results = entry
+    return results[bisect.bisect_right(breakpoints, threshold) - 1]
+
+class ThresholdIndex:
+    """
+    Breakpoint lists of a set of paths, in input order.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else []
+
+    @classmethod
+    def build(cls, path_records):
+        return cls([index_path(rec) for rec in path_records])
+
+    def results_at(self, threshold):
+        """
+        The analysis results at 'threshold', identical to
+        analyze_all_paths(path_records, threshold).
+        """
+        return [result_at(entry, threshold) for entry in self.entries]
+
+    def totals_at(self, threshold):
+        totals = path_analyzer.empty_totals()
+        for result in self.results_at(threshold):
+            path_analyzer.add_to_totals(totals, result)
+        return totals
+
+    def totals_step_function(self):
+        """
+        Network totals for every threshold, as a list of (from_threshold,
+        totals) in ascending order; each entry holds until the next one.
+        Residuals are accumulated in hundredths of a km (the results are
+        rounded to 2 decimals), so the running totals don't drift.
+        """
+        def counts(result):
+            ok = 1 if result['status'] == 'OK' else 0
+            return (ok, 1 - ok, len(result['regenerators']), len(result['opcs']),
+                    int(round(result['residual_distance'] * 100)))
+
+        current = [0, 0, 0, 0, 0]
+        events = {}
+        for breakpoints, results in self.entries:
+            previous = counts(results[0])
+            for k in range(5):
+                current[k] += previous[k]
+            for b, result in zip(breakpoints[1:], results[1:]):
+                now = counts(result)
+                delta = events.setdefault(b, [0, 0, 0, 0, 0])
+                for k in range(5):
+                    delta[k] += now[k] - previous[k]
+                previous = now
+
+        def as_totals(c):
+            return {
+                'paths': len(self.entries),
+                'ok': c[0],
+                'unreachable': c[1],
+                'regenerators': c[2],
+                'opcs': c[3],
+                'residual_distance': c[4] / 100.0
+            }
+
+        steps = [(-math.inf, as_totals(current))]
+        for b in sorted(events):
+            delta = events[b]
+            if not any(delta):
+                continue
+            for k in range(5):
+                current[k] += delta[k]
+            steps.append((b, as_totals(current)))
+        return steps
+
+    def save(self, filepath):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for breakpoints, results in self.entries:
+                f.write(json.dumps({
+                    'breakpoints': breakpoints,
+                    'results': [[r['source'], r['destination'], r['total_distance'],
+                                 r['regenerators'], r['opcs'], r['residual_distance'],
+                                 r['status']] for r in results]
+                }) + "\n")
+
+    @classmethod
+    def load(cls, filepath):
+        entries = []
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                item = json.loads(line)
+                entries.append((item['breakpoints'],
+                                [AnalysisResult(*r) for r in item['results']]))
+        return cls(entries)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Threshold breakpoint index for exact what-if queries.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build', help="index every path of a Simon output file")
+    p.add_argument('input_file')
+    p.add_argument('index_file')
+    p = sub.add_parser('query', help="results and totals at one threshold")
+    p.add_argument('index_file')
+    p.add_argument('threshold', type=float)
+    p.add_argument('output_csv', nargs='?')
+    p = sub.add_parser('steps', help="network totals as a step function of the threshold")
+    p.add_argument('index_file')
+    p.add_argument('steps_csv', nargs='?')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        index = ThresholdIndex.build(input_parser.parse_simon_output_file(args.input_file))
+        index.save(args.index_file)
+        breakpoints = sum(len(b) - 1 for b, _ in index.entries)
+        print(f"Indexed {len(index.entries)} paths ({breakpoints} breakpoints) into {args.index_file}")
+    elif args.command == 'query':
+        index = ThresholdIndex.load(args.index_file)
+        results = index.results_at(args.threshold)
+        totals = path_analyzer.empty_totals()
+        for result in results:
+            path_analyzer.add_to_totals(totals, result)
+        if args.output_csv:
+            output_formatter.write_analysis_to_csv(results, args.output_csv)
+        print(f"At {args.threshold} km: {path_analyzer.format_totals(totals)}")
+    else:
+        steps = ThresholdIndex.load(args.index_file).totals_step_function()
+        out = open(args.steps_csv, 'w', newline='', encoding='utf-8') if args.steps_csv else sys.stdout
+        writer = csv.writer(out)
+        writer.writerow(['from_threshold', 'paths', 'ok', 'unreachable', 'regenerators', 'opcs',
+                         'residual_distance'])
+        for b, t in steps:
+            writer.writerow([b, t['paths'], t['ok'], t['unreachable'], t['regenerators'], t['opcs'],
+                             f"{t['residual_distance']:.2f}"])
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+topology_paths.py
+
+Computes the all-pairs shortest paths directly from a topology edge list, so
+the pipeline no longer needs the Simon simulator's text output.
+
+Edge list format (one link per line, '#' starts a comment):
+   NODE_A NODE_B KM TYPE
+
+Where TYPE is one of:
+    A / access / 1  => access link; NODE_A is the access node, NODE_B its ROADM
+    R / roadm  / 0  => ROADM-to-ROADM link
+
+Example:
+  1 25 0.01 A
+  25 26 800.00 R
+
+Links are bidirectional. Paths are computed between every ordered pair of
+access nodes (in numeric order, like Simon), and access nodes other than the
+path's own source are never used as transit nodes, so every path has the shape
+    access node -> ROADM chain -> access node
+
+The records are the same records.PathRecord objects parse_simon_output_file()
+produces (node_ids ending with the destination, distances ending with 0.0);
+unparsed_line holds a Simon-style line only if keep_lines=True.
+"""
+
+import collections
+import heapq
+import multiprocessing
+
+from records import PathRecord
+
+ACCESS_FLAGS = {'a', 'access', '1'}
+ROADM_FLAGS = {'r', 'roadm', '0'}
+
+def load_topology(filepath):
+    """
+    Reads the edge list. Returns (adjacency, access_nodes) where adjacency is
+    { nodeID: [ (neighborID, km), ... ] } and access_nodes a sorted list.
+    """
+    adjacency = {}
+    access_nodes = set()
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            tokens = line.replace(',', ' ').split()
+            if len(tokens) != 4:
+                raise ValueError(f"{filepath}:{line_no}: expected 'NODE NODE KM TYPE', got {line!r}")
+            a_str, b_str, km_str, flag = tokens
+            a = int(a_str)
+            b = int(b_str)
+            km = float(km_str)
+            flag = flag.lower()
+            if flag in ACCESS_FLAGS:
+                access_nodes.add(a)
+            elif flag not in ROADM_FLAGS:
+                raise ValueError(f"{filepath}:{line_no}: unknown link type {tokens[3]!r}")
+            adjacency.setdefault(a, []).append((b, km))
+            adjacency.setdefault(b, []).append((a, km))
+
+    return adjacency, sorted(access_nodes)
+
+def shortest_paths_from(source, adjacency, access_nodes):
+    """
+    Heap-based Dijkstra from one access node. Other access nodes are reached
+    but never expanded, so they only ever appear as path endpoints.
+    Returns (dist, prev) dicts.
+    """
+    dist = {source: 0.0}
+    prev = {}
+    done = set()
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in done:
+            continue
+        done.add(u)
+        if u != source and u in access_nodes:
+            continue
+        for v, km in adjacency.get(u, ()):
+            nd = d + km
+            if v not in dist or nd < dist[v]:
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(heap, (nd, v))
+    return dist, prev
+
+def format_simon_line(record):
+    """
+    Renders a record in the Simon output format (without the Half trailer).
+    """
+    node_ids = record.node_ids
+    hops = " ".join(f"{nid} ({dist:.2f})" for nid, dist in zip(node_ids[:-1], record.distances))
+    return (f"{record.source}->{record.destination} (Cost: {record.total_cost:.2f}) "
+            f"{hops} {node_ids[-1]} (LinkCount: {len(node_ids) - 1})")
+
+def paths_from_source(source, adjacency, access_nodes, keep_lines=False):
+    """
+    All path records starting at 'source', in destination order.
+    Unreachable destinations are skipped (Simon doesn't list them either).
+    """
+    access_set = set(access_nodes)
+    dist, prev = shortest_paths_from(source, adjacency, access_set)
+
+    records = []
+    for destination in access_nodes:
+        if destination == source or destination not in dist:
+            continue
+        rec = build_path_record(source, destination, dist, prev, adjacency)
+        if keep_lines:
+            rec.unparsed_line = format_simon_line(rec)
+        records.append(rec)
+    return records
+
+def build_path_record(source, destination, dist, prev, adjacency):
+    """
+    Follows the Dijkstra predecessors back from 'destination' and builds its
+    path record.
+    """
+    chain = [destination]
+    while chain[-1] != source:
+        chain.append(prev[chain[-1]])
+    chain.reverse()
+
+    hop_distances = []
+    for i in range(len(chain) - 1):
+        u = chain[i]
+        v = chain[i+1]
+        hop_distances.append(min(w for (n, w) in adjacency[u] if n == v))
+    hop_distances.append(0.0)
+
+    return PathRecord(source, destination, round(dist[destination], 2), chain, hop_distances)
+
+# Worker-process state, set once per process by the pool initializer so the
+# graph isn't pickled with every task.
+_worker_graph = None
+
+def _init_worker(adjacency, access_nodes, keep_lines):
+    global _worker_graph
+    _worker_graph = (adjacency, access_nodes, keep_lines)
+
+def _worker_paths_from(source):
+    adjacency, access_nodes, keep_lines = _worker_graph
+    return paths_from_source(source, adjacency, access_nodes, keep_lines)
+
+def iter_topology_paths(adjacency, access_nodes, workers=1, keep_lines=False):
+    """
+    Yields path records for all ordered access-node pairs, source by source.
+    With workers > 1 each source's Dijkstra runs in a separate process; the
+    output order is the same as the sequential run, and at most 2 sources per
+    worker are computed ahead of the consumer, so memory stays bounded by a
+    few sources' paths.
+    """
+    if workers is None or workers <= 1:
+        for source in access_nodes:
+            for rec in paths_from_source(source, adjacency, access_nodes, keep_lines):
+                yield rec
+        return
+
+    max_in_flight = 2 * workers
+    pending = collections.deque()
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(adjacency, access_nodes, keep_lines)) as pool:
+        for source in access_nodes:
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().get()
+            pending.append(pool.apply_async(_worker_paths_from, (source,)))
+        while pending:
+            yield from pending.popleft().get()
+
+def stream_path_records(filepath, workers=1, keep_lines=False):
+    """
+    Loads the edge list and yields the path records one at a time (for
+    callers that only need one pass, like --top or --demand).
+    """
+    adjacency, access_nodes = load_topology(filepath)
+    yield from iter_topology_paths(adjacency, access_nodes, workers, keep_lines)
+
+def generate_path_records(filepath, workers=1, keep_lines=False):
+    """
+    Loads the edge list and returns the list of all path records.
+    """
+    return list(stream_path_records(filepath, workers, keep_lines))
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+traffic_matrix.py
+
+Demand-weighted totals: instead of counting every (source, destination)
+pair as one lightpath, weight each pair's result by the number of
+lightpaths a traffic matrix asks for.
+
+Demand file format (one pair per line, '#' starts a comment):
+   SRC DST LIGHTPATHS
+
+Example:
+  1 24 3
+  24 1 3
+  2 5 0.5
+
+The join is done with flat arrays and index arithmetic only:
+  - endpoint node IDs are mapped to dense indices 0..N-1 through an array
+    indexed by node ID (dense_of[node_id], -1 if not in the matrix),
+  - the demand is stored per pair slot: in one N*N float array,
+    demand[i*N + j], when the matrix is dense enough (DENSE_FILL), otherwise
+    in CSR form (each source row's destinations sorted in 'cols', its slots
+    starting at offsets[i]), found by a bisection over the row,
+  - the pairs already weighted are a bitmap over the same slots,
+  - per-node regenerator/OPC units accumulate in arrays indexed by node ID.
+So looking up a result's demand is a few array reads, memory follows the
+number of listed pairs (plus the largest node ID), and the join stays linear
+for 10^6-pair matrices. Node IDs must be non-negative integers of moderate
+size, as in Simon output.
+A pair listed twice in the demand file gets the sum of both lines. If the
+results contain a pair more than once, only its first result is weighted.
+"""
+
+from array import array
+from bisect import bisect_left
+
+# the N*N array is used while at least this fraction of it would be listed pairs
+DENSE_FILL = 0.25
+
+class TrafficMatrix:
+    def __init__(self, pairs):
+        """
+        pairs: list of (source, destination, lightpaths), node IDs >= 0.
+        """
+        max_id = -1
+        for s, d, _ in pairs:
+            max_id = max(max_id, s, d)
+        self.dense_of = array('q', [-1]) * (max_id + 1)
+        n = 0
+        for s, d, _ in pairs:
+            for node in (s, d):
+                if self.dense_of[node] < 0:
+                    self.dense_of[node] = n
+                    n += 1
+        self.size = n
+
+        # one key i*N + j per line; sorted, equal keys are the same pair
+        keys = [self.dense_of[s] * n + self.dense_of[d] for s, d, _ in pairs]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        distinct = sum(1 for a, b in zip(order, order[1:]) if keys[a] != keys[b]) + (1 if keys else 0)
+        self.dense = distinct > 0 and distinct >= DENSE_FILL * n * n
+        if self.dense:
+            self.demand = array('d', [0.0]) * (n * n)
+            for k, (_, _, lightpaths) in zip(keys, pairs):
+                self.demand[k] += lightpaths
+            self.offsets = None
+            self.cols = None
+        else:
+            self.offsets = array('q', [0]) * (n + 1)
+            self.cols = array('q')
+            self.demand = array('d')
+            last = -1
+            for idx in order:
+                k = keys[idx]
+                if k != last:
+                    self.cols.append(k % n)
+                    self.demand.append(0.0)
+                    self.offsets[k // n + 1] += 1
+                    last = k
+                self.demand[-1] += pairs[idx][2]
+            for i in range(n):
+                self.offsets[i + 1] += self.offsets[i]
+        self.total_demand = sum(self.demand)
+
+    def slot(self, source, destination):
+        """
+        Index of the pair in self.demand, or -1 if it isn't in the matrix.
+        """
+        dense_of = self.dense_of
+        limit = len(dense_of)
+        if not (0 <= source < limit and 0 <= destination < limit):
+            return -1
+        i = dense_of[source]
+        j = dense_of[destination]
+        if i < 0 or j < 0:
+            return -1
+        if self.dense:
+            return i * self.size + j
+        lo = self.offsets[i]
+        hi = self.offsets[i + 1]
+        k = bisect_left(self.cols, j, lo, hi)
+        if k < hi and self.cols[k] == j:
+            return k
+        return -1
+
+    def lightpaths(self, source, destination):
+        k = self.slot(source, destination)
+        return self.demand[k] if k >= 0 else 0.0
+
+def load_traffic_matrix(filepath):
+    pairs = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            tokens = line.replace(',', ' ').split()
+            if len(tokens) != 3:
+                raise ValueError(f"{filepath}:{line_no}: expected 'SRC DST LIGHTPATHS', got {line!r}")
+            lightpaths = float(tokens[2])
+            if lightpaths < 0:
+                raise ValueError(f"{filepath}:{line_no}: negative demand {tokens[2]!r}")
+            source = int(tokens[0])
+            destination = int(tokens[1])
+            if source < 0 or destination < 0:
+                # node IDs index the dense_of and per-node unit arrays
+                raise ValueError(f"{filepath}:{line_no}: negative node ID in {line!r}")
+            pairs.append((source, destination, lightpaths))
+    return TrafficMatrix(pairs)
+
+def _grow(units, node):
+    if node >= len(units):
+        units.extend(array('d', [0.0]) * (node + 1 - len(units)))
+
+def weighted_totals(results, matrix):
+    """
+    Joins a stream of analysis results (one per pair) against the matrix.
+    Returns (totals, regenerator_units, opc_units) where the unit arrays are
+    indexed by node ID and totals is
+      {
+        'demand_lightpaths', 'matched_lightpaths', 'unmatched_lightpaths',
+        'unreachable_lightpaths', 'regenerator_units', 'opc_units',
+        'residual_km'
+      }
+    'unmatched' is demand for pairs that have no result. Each pair is
+    weighted once, by its first result.
+    """
+    # matrix.slot(), inlined: this loop runs once per result row
+    dense_of = matrix.dense_of
+    limit = len(dense_of)
+    n = matrix.size
+    dense = matrix.dense
+    offsets = matrix.offsets
+    cols = matrix.cols
+    demand = matrix.demand
+    seen = bytearray(len(demand))  # one flag per pair slot
+    regen_units = array('d')
+    opc_units = array('d')
+    matched = 0.0
+    unreachable = 0.0
+    residual_km = 0.0
+
+    for result in results:
+        s = result['source']
+        d = result['destination']
+        if not (0 <= s < limit and 0 <= d < limit):
+            continue
+        i = dense_of[s]
+        j = dense_of[d]
+        if i < 0 or j < 0:
+            continue
+        if dense:
+            k = i * n + j
+        else:
+            hi = offsets[i + 1]
+            k = bisect_left(cols, j, offsets[i], hi)
+            if k == hi or cols[k] != j:
+                continue
+        if seen[k]:
+            continue
+        w = demand[k]
+        if not w:
+            continue
+        seen[k] = 1
+        matched += w
+        if result['status'] != 'OK':
+            unreachable += w
+            continue
+        residual_km += w * result['residual_distance']
+        for node in result['regenerators']:
+            _grow(regen_units, node)
+            regen_units[node] += w
+        for node in result['opcs']:
+            _grow(opc_units, node)
+            opc_units[node] += w
+
+    totals = {
+        'demand_lightpaths': matrix.total_demand,
+        'matched_lightpaths': matched,
+        'unmatched_lightpaths': matrix.total_demand - matched,
+        'unreachable_lightpaths': unreachable,
+        'regenerator_units': sum(regen_units),
+        'opc_units': sum(opc_units),
+        'residual_km': residual_km
+    }
+    return totals, regen_units, opc_units
+
+def format_weighted_totals(totals):
+    return (f"{totals['demand_lightpaths']:g} lightpaths demanded "
+            f"({totals['unmatched_lightpaths']:g} on pairs without a path, "
+            f"{totals['unreachable_lightpaths']:g} unreachable), "
+            f"{totals['regenerator_units']:g} regenerator units, {totals['opc_units']:g} OPC units, "
+            f"demand-weighted residual {totals['residual_km']:.2f} km")
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+tree_engine.py
+
+Shortest-path-tree sharing: analyzes all paths from one source in a single
+depth-first walk over the prefix tree of their ROADM sequences.
+
+In an all-pairs dump the paths from one source share long prefixes, and the
+regenerator walk of analyze_path() only depends on the prefix up to the
+current node: the cumulative distance, the regenerators placed so far, the
+UNREACHABLE decision, and the OPC of every section that is already closed by
+a regenerator. This engine:
+
+  1) groups path_records by source,
+  2) builds the prefix tree of their sub-arrays (source ROADM ... destination
+     ROADM), keyed by (nodeID, distance from the previous node),
+  3) walks the tree once, carrying partial sums and regenerator/OPC state on
+     stacks, so each tree edge is processed once instead of once per path,
+  4) per path, applies only the tail rules at its destination ROADM: the
+     under-threshold shortcut (no regenerators, one OPC over the whole
+     sub-array), the OPC of the last section, and the residual distance.
+     The total distance is the running partial sum carried down the tree,
+     and the OPC scans are bisections over it (_place_opc()), so a path costs
+     O(log length) plus its output instead of a rescan of its hops.
+
+Building the tree still looks up every hop of every path once, and each path
+still gets its own result, so the gain depends on how much the paths share:
+about 1.6x over analyze_all_paths() on a 12x12 grid, 2x on a 550-node
+topology, and only 1.1x on Simon dumps of short paths.
+
+On Python 3.12+, sum() compensates rounding, so it can differ from the running
+partial sum in the last bit; there the total is recomputed with sum() per
+path, as analyze_path() does, at O(length) per path.
+
+Results are identical to analyze_path() (fuzz_harness.py --engine tree).
+Paths the tree model doesn't cover exactly (fewer than 3 nodes, repeated node
+IDs, negative distances) are handed to analyze_path() directly.
+"""
+
+import path_analyzer
+from records import AnalysisResult, path_arrays
+
+# Whether sum() over floats is plain left-to-right addition (CPython before
+# 3.12) rather than compensated summation. Only then is the running partial
+# sum bit-for-bit analyze_path()'s sum(sub_distances).
+_SUM_IS_SEQUENTIAL = sum([1e16, 1.0, 1.0]) == (1e16 + 1.0) + 1.0
+
+class _TrieNode:
+    __slots__ = ('node_id', 'dist', 'children', 'ends')
+
+    def __init__(self, node_id, dist):
+        self.node_id = node_id
+        self.dist = dist          # distance from the parent tree node
+        self.children = {}        # (nodeID, dist) -> _TrieNode
+        self.ends = []            # (record index, node_ids, distances) ending here
+
+def build_prefix_tree(members):
+    """
+    members: list of (record index, node_ids, distances) with full_n >= 3.
+    Returns the root's children dict (one entry per distinct source ROADM).
+    """
+    roots = {}
+    for member in members:
+        _, node_ids, distances = member
+        last = len(node_ids) - 2  # full index of the destination ROADM
+        key = (node_ids[1], 0.0)
+        node = roots.get(key)
+        if node is None:
+            node = roots[key] = _TrieNode(node_ids[1], 0.0)
+        for full_i in range(2, last + 1):
+            key = (node_ids[full_i], distances[full_i - 1])
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = _TrieNode(key[0], key[1])
+            node = child
+        node.ends.append(member)
+    return roots
+
+def _place_opc(partial, si, ei):
+    """
+    Same result as place_one_opc_in_subsection() in analyze_path(); every
+    index strictly inside a section is a valid sub-array index. Returns the
+    sub-array index of the OPC, or None.
+
+    Distances are never negative here, so partial only grows and
+    partial[idx] - midpoint changes sign once: |partial[idx] - midpoint| falls
+    up to the first idx at or past the midpoint (j) and rises from there.
+    The scan's first minimum is then either j or the first index of the run
+    before j that shares j-1's difference, found by bisection in O(log n)
+    instead of scanning the section.
+    """
+    if ei - si + 1 < 3:
+        return None
+    sec_dist = abs(partial[ei] - partial[si])
+    if sec_dist <= 0:
+        return None
+    midpoint = partial[si] + sec_dist/2.0
+
+    # j: first index in [si+1, ei) with partial[j] >= midpoint (ei if none)
+    lo, hi = si + 1, ei
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if partial[mid] < midpoint:
+            lo = mid + 1
+        else:
+            hi = mid
+    j = lo
+
+    best_idx = None
+    best_diff = 1e15
+    if j > si + 1:
+        # left of j the difference never rises: find where it first reaches j-1's
+        left_diff = abs(partial[j-1] - midpoint)
+        lo, hi = si + 1, j - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if abs(partial[mid] - midpoint) > left_diff:
+                lo = mid + 1
+            else:
+                hi = mid
+        if left_diff < best_diff:
+            best_idx, best_diff = lo, left_diff
+    if j < ei:
+        # j wins only if strictly closer; on a tie the scan keeps the earlier index
+        diff = abs(partial[j] - midpoint)
+        if diff < best_diff:
+            best_idx = j
+    return best_idx
+
+def _analyze_tree(roots, path_records, results, threshold):
+    # Per-depth state of the current root-to-node chain. Index d describes
+    # sub-array index d of every path going through the current tree node.
+    nodes = []        # nodeID
+    partial = []      # sub_partial_sums
+    local = []        # regenerator walk: distance since the last anchor
+    unreach = []      # walk hit UNREACHABLE at or before this depth
+    anchor = []       # sub-array index of the last regenerator (or 0)
+    sum_abs = []      # sum of |left - right| over closed sections
+    regens_len = []   # len(regens) / len(opcs) after this depth
+    opcs_len = []
+    regens = []       # regenerator sub-array indices
+    opcs = []         # OPC nodeIDs of closed sections
+
+    for root in roots.values():
+        stack = [(root, 0)]
+        while stack:
+            tnode, d = stack.pop()
+
+            # unwind the state back to the parent's depth
+            del nodes[d:], partial[d:], local[d:], unreach[d:], anchor[d:]
+            del sum_abs[d:], regens_len[d:], opcs_len[d:]
+
+            if d == 0:
+                del regens[:], opcs[:]
+                p, loc, un, anc, sabs = 0.0, 0.0, False, 0, 0.0
+            else:
+                del regens[regens_len[d-1]:], opcs[opcs_len[d-1]:]
+                dist = tnode.dist
+                p = partial[d-1] + dist
+                loc = local[d-1] + dist
+                un = unreach[d-1]
+                anc = anchor[d-1]
+                sabs = sum_abs[d-1]
+                if not un and loc > threshold:
+                    if d - 1 < 1:
+                        un = True
+                    else:
+                        # regenerator at d-1 closes the section [anc, d-1]
+                        r = d - 1
+                        opc_idx = _place_opc(partial, anc, r)
+                        if opc_idx is not None and nodes[opc_idx]:
+                            opcs.append(nodes[opc_idx])
+                            leftd = abs(partial[opc_idx] - partial[anc])
+                            rightd = abs(partial[r] - partial[opc_idx])
+                            sabs += abs(leftd - rightd)
+                        regens.append(r)
+                        anc = r
+                        loc = dist
+                        if loc > threshold:
+                            un = True
+
+            nodes.append(tnode.node_id)
+            partial.append(p)
+            local.append(loc)
+            unreach.append(un)
+            anchor.append(anc)
+            sum_abs.append(sabs)
+            regens_len.append(len(regens))
+            opcs_len.append(len(opcs))
+
+            for rec_idx, node_ids, distances in tnode.ends:
+                results[rec_idx] = _finish_path(
+                    path_records[rec_idx], d, distances, nodes, partial,
+                    un, anc, sabs, regens, opcs, threshold
+                )
+
+            for child in tnode.children.values():
+                stack.append((child, d + 1))
+
+def _finish_path(rec, e, distances, nodes, partial, un, anc, sabs, regens, opcs, threshold):
+    """
+    Tail rules for one path whose destination ROADM is at sub-array index e.
+    """
+    source = rec['source']
+    destination = rec['destination']
+    sub_n = e + 1
+    if _SUM_IS_SEQUENTIAL:
+        # partial[e] is built with the same += order as sum(sub_distances)
+        total_sub_distance = partial[e]
+    else:
+        # this sum() compensates rounding, so only a real sum() matches analyze_path
+        total_sub_distance = sum(distances[1:sub_n])
+
+    if total_sub_distance <= threshold:
+        residual = total_sub_distance
+        opc_list = []
+        if sub_n >= 3:
+            c = _place_opc(partial, 0, e)
+            if c is not None:
+                opc_list.append(nodes[c])
+                leftd = abs(partial[c] - partial[0])
+                rightd = abs(partial[e] - partial[c])
+                residual = 0.0 + abs(leftd - rightd)
+        return AnalysisResult(
+            source=source,
+            destination=destination,
+            total_distance=round(total_sub_distance,2),
+            regenerators=[],
+            opcs=opc_list,
+            residual_distance=round(residual,2),
+            status='OK'
+        )
+
+    if un:
+        return AnalysisResult(
+            source=source,
+            destination=destination,
+            total_distance=round(total_sub_distance,2),
+            regenerators=[],
+            opcs=[],
+            residual_distance=0.0,
+            status='UNREACHABLE'
+        )
+
+    if not regens:
+        # over the threshold by sum() but not by the running walk: analyze_path
+        # places nothing and reports the whole sub-array as residual
+        residual = total_sub_distance
+        opc_list = []
+    else:
+        opc_list = list(opcs)
+        c = _place_opc(partial, anc, e)
+        if c is not None and nodes[c]:
+            opc_list.append(nodes[c])
+            leftd = abs(partial[c] - partial[anc])
+            rightd = abs(partial[e] - partial[c])
+            sabs += abs(leftd - rightd)
+        leftover = abs(partial[e] - partial[anc])
+        residual = sabs + leftover if opc_list else leftover
+
+    return AnalysisResult(
+        source=source,
+        destination=destination,
+        total_distance=round(total_sub_distance,2),
+        regenerators=[nodes[r] for r in regens],
+        opcs=opc_list,
+        residual_distance=round(residual,2),
+        status='OK'
+    )
+
+def analyze_all_paths_tree(path_records, threshold=None):
+    """
+    Drop-in replacement for path_analyzer.analyze_all_paths(): returns the
+    results in input order.
+    """
+    if threshold is None:
+        threshold = path_analyzer.REGENERATOR_THRESHOLD
+
+    results = [None] * len(path_records)
+    groups = {}
+    for rec_idx, rec in enumerate(path_records):
+        node_ids, distances = path_arrays(rec)
+        full_n = len(node_ids)
+        if full_n < 3 or len(set(node_ids)) != full_n or min(distances) < 0:
+            results[rec_idx] = path_analyzer.analyze_path(rec, threshold)
+            continue
+        groups.setdefault(rec['source'], []).append((rec_idx, node_ids, distances))
+
+    for members in groups.values():
+        _analyze_tree(build_prefix_tree(members), path_records, results, threshold)
+    return results